@@ -6,6 +6,11 @@ from . import seasons
 from . import finders
 from . import boxscores
 from . import misc
+from . import aio
+from . import cache
+from . import framecache
+from . import schema
+from . import ttl
 
 from .finders import finder
 from .finders.finder import (GamePlayFinder, PlayerSeasonFinder, PlayerGameFinder,
@@ -17,6 +22,7 @@ from .teams import Team
 from .seasons import Season
 from .boxscores import BoxScore
 from .misc import get_penalty_logs, get_fumbles_lost
+from .aio import fetch_many_async
 
 # modules/variables to expose
 __all__ = [
@@ -31,4 +37,6 @@ __all__ = [
     'TeamGameFinder', 'TeamStreakFinder',
     'DriveFinder', 'DraftFinder',
     'misc', 'get_penalty_logs', 'get_fumbles_lost',
+    'aio', 'fetch_many_async',
+    'cache', 'framecache', 'schema', 'ttl',
 ]
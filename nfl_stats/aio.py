@@ -0,0 +1,160 @@
+import asyncio
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from . import decorators
+from . import utils
+
+__all__ = ['get_html', 'fetch_many_async']
+
+# maximum number of requests in flight at once on an event loop
+MAX_CONCURRENCY = 8
+
+# per-loop semaphores bounding the number of requests in flight
+_SEMAPHORES = weakref.WeakKeyDictionary()
+
+# per-loop futures for the pages being fetched, so concurrent calls for the
+# same URL share one download
+_IN_FLIGHT = weakref.WeakKeyDictionary()
+
+# threads running the blocking network calls; one pool per process
+_EXECUTOR = None
+_EXECUTOR_PID = None
+
+
+def _get_semaphore():
+    loop = asyncio.get_running_loop()
+    if loop not in _SEMAPHORES:
+        _SEMAPHORES[loop] = asyncio.Semaphore(MAX_CONCURRENCY)
+    return _SEMAPHORES[loop]
+
+
+def _get_executor():
+    global _EXECUTOR, _EXECUTOR_PID
+    if _EXECUTOR is None or _EXECUTOR_PID != os.getpid():
+        _EXECUTOR = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY,
+                                       thread_name_prefix='nfl_stats_aio')
+        _EXECUTOR_PID = os.getpid()
+    return _EXECUTOR
+
+
+async def get_html(url, allow_redirect=False):
+    """Async counterpart of `utils.get_html`. Reads and fills the same cache,
+    and draws send slots from the same rate limiter, but waits for its slot
+    and the response without blocking the event loop.
+    :url: the absolute URL of the desired page.
+    :returns: a string of HTML.
+    """
+    loop = asyncio.get_running_loop()
+    in_flight = _IN_FLIGHT.setdefault(loop, {})
+    key = (url, allow_redirect)
+    if key not in in_flight:
+        in_flight[key] = loop.create_task(_fetch(url, allow_redirect))
+        in_flight[key].add_done_callback(lambda _: in_flight.pop(key, None))
+    # shield the shared fetch so that one cancelled caller does not cancel it
+    # for everyone else
+    return await asyncio.shield(in_flight[key])
+
+
+async def _fetch(url, allow_redirect):
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    text = await loop.run_in_executor(
+        executor, decorators.read_cached_html, url)
+    if text is not None:
+        return text
+
+    # wait out any other thread or process already fetching this page
+    lock = decorators.FillLock(url)
+    await _acquire(lock)
+    try:
+        text = await loop.run_in_executor(
+            executor, decorators.read_cached_html, url)
+        if text is not None:
+            return text
+
+        validators = await loop.run_in_executor(
+            executor, decorators.cached_validators, url)
+        text, validators = await _request(url, allow_redirect, validators)
+        if text is None:
+            # the stale copy is unchanged, so mark it as fresh; if it was
+            # evicted in the meantime, fetch the page in full
+            text = await loop.run_in_executor(
+                executor, decorators.read_cached_html, url, True)
+            if text is not None:
+                await loop.run_in_executor(
+                    executor, decorators.touch_cached_html, url)
+                return text
+            text, validators = await _request(url, allow_redirect, {})
+        await loop.run_in_executor(
+            executor, decorators.write_cached_html, url, text, validators)
+        return text
+    finally:
+        lock.release()
+
+
+async def _acquire(lock):
+    # takes a FillLock in an executor thread. The thread keeps waiting for
+    # the lock if the task is cancelled meanwhile, so whichever of the two
+    # comes second releases it, instead of leaving it held for good
+    loop = asyncio.get_running_loop()
+    guard = threading.Lock()
+    state = {'owned': False, 'abandoned': False}
+
+    def acquire():
+        lock.acquire()
+        with guard:
+            if state['abandoned']:
+                lock.release()
+            else:
+                state['owned'] = True
+
+    try:
+        await loop.run_in_executor(_get_executor(), acquire)
+    except BaseException:
+        with guard:
+            state['abandoned'] = True
+            if state['owned']:
+                lock.release()
+        raise
+
+
+async def _request(url, allow_redirect, validators):
+    loop = asyncio.get_running_loop()
+    async with _get_semaphore():
+        attempt = 1
+        while True:
+            delay = utils.get_limiter().reserve(url)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                return await loop.run_in_executor(
+                    _get_executor(), utils.request_html, url, allow_redirect,
+                    validators)
+            except Exception as err:
+                if utils.backoff(url, attempt, err) is None:
+                    raise
+            attempt += 1
+
+
+async def fetch_many_async(urls, max_concurrency=None):
+    """Fetches many pages concurrently on the running event loop. Duplicate
+    URLs are only fetched once.
+    :urls: an iterable of absolute URLs.
+    :max_concurrency: if given, the maximum number of these pages to fetch at
+        once. The overall limit of MAX_CONCURRENCY still applies.
+    :returns: a dict mapping each URL, in order, to its HTML or to the
+        exception raised while fetching it.
+    """
+    urls = list(dict.fromkeys(urls))
+    limit = asyncio.Semaphore(max_concurrency or len(urls) or 1)
+
+    async def _fetch(url):
+        async with limit:
+            return await get_html(url)
+
+    results = await asyncio.gather(*(_fetch(url) for url in urls),
+                                   return_exceptions=True)
+    return dict(zip(urls, results))
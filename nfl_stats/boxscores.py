@@ -7,7 +7,9 @@ import pandas as pd
 from pyquery import PyQuery as pq
 
 from nfl_stats import PFR_BASE
+from . import aio
 from . import decorators
+from . import framecache
 from . import utils
 from . import teams
 from . import pbp
@@ -20,12 +22,16 @@ GAMES_URL = PFR_BASE + '/years/{y}/games.htm'
 
 
 def get_boxscore_ids(strt_yr, end_yr):
+    game_urls = [GAMES_URL.format(y=y) for y in range(strt_yr, end_yr+1)]
+    pages = utils.get_many(game_urls)
     all_bids = []
-    for y in range(strt_yr, end_yr+1):
-        game_url = GAMES_URL.format(y=y)
-        doc = pq(utils.get_html(game_url))
+    for game_url in game_urls:
+        html = pages[game_url]
+        if isinstance(html, Exception):
+            raise html
+        doc = pq(html)
         tab = utils.parse_table(doc('table#games'))
-        bids = [b for b in list(tab['boxscore_id']) if b is not None]
+        bids = [b for b in list(tab['boxscore_id']) if pd.notnull(b)]
         all_bids.extend(bids)
     return all_bids
 
@@ -33,6 +39,7 @@ def get_boxscore_ids(strt_yr, end_yr):
 class BoxScore(metaclass=decorators.CACHED):
 
     def __init__(self, boxscore_id):
+        self.base_url = PFR_BASE + '/boxscores/{}.htm'.format(boxscore_id)
         self.boxscore_id = boxscore_id
 
     def __eq__(self, other):
@@ -52,13 +59,24 @@ class BoxScore(metaclass=decorators.CACHED):
     def __reduce__(self):
         return BoxScore, (self.boxscore_id,)
 
+    def release(self):
+        """Frees the parsed page of this box score, keeping the results
+        already extracted from it.
+        """
+        decorators.release(self)
+
     @decorators.memoize
     def get_doc(self):
-        url = (PFR_BASE +
-               '/boxscores/{}.htm'.format(self.boxscore_id))
-        doc = pq(utils.get_html(url))
+        doc = pq(utils.get_html(self.base_url))
         return doc
 
+    async def aget_doc(self):
+        """Async counterpart of get_doc; the page is fetched without blocking
+        the event loop.
+        """
+        await aio.get_html(self.base_url)
+        return self.get_doc()
+
     @decorators.memoize
     def get_game_info(self):
         doc = self.get_doc()
@@ -427,6 +445,7 @@ class BoxScore(metaclass=decorators.CACHED):
         return utils.parse_officials_table(table)
 
     @decorators.memoize
+    @framecache.cached_frame(lambda self: self.base_url)
     def player_stats(self):
         """Gets the stats for offense, defense, returning, and kicking of
         individual players in the game.
@@ -447,6 +466,7 @@ class BoxScore(metaclass=decorators.CACHED):
         return df
 
     @decorators.memoize
+    @framecache.cached_frame(lambda self: self.base_url)
     def snap_counts(self):
         """Gets the snap counts for both teams' players and returns them in a
         DataFrame. Note: only goes back to 2012.
@@ -0,0 +1,816 @@
+import collections
+import getpass
+import gzip
+import hashlib
+import itertools
+import json
+import os
+import pickle
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+import appdirs
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+__all__ = [
+    'CacheEntry', 'CacheStore', 'FileCacheStore', 'SQLiteCacheStore',
+    'get_store', 'set_store', 'train_dictionary', 'evict', 'compact',
+    'CacheStats', 'page_type', 'SharedMemoStore', 'get_memo_store',
+]
+
+# limits enforced by `evict`: the disk budget for the cache in bytes, and the
+# number of days a page may go unread before it is removed (None for no limit)
+MAX_CACHE_BYTES = None
+MAX_IDLE_DAYS = None
+# pages a process writes to the cache between automatic runs of `evict`, which
+# run in a background thread
+EVICT_INTERVAL = 1000
+# seconds between updates of a page's last access time, so that reads of a
+# hot page do not each turn into a write
+ACCESS_RESOLUTION = 3600
+
+# compression levels for cached pages; zstd is used when the zstandard
+# package is installed, gzip otherwise
+ZSTD_LEVEL = 6
+GZIP_LEVEL = 6
+
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+_GZIP_MAGIC = b'\x1f\x8b'
+
+# zstd dictionaries by ID, and the per-thread compressor for the current one
+_ZSTD_DICTS = {}
+_ZSTD_LOCAL = threading.local()
+# the ID of the dictionary new pages are compressed with (None for none), read
+# once per process and updated by `train_dictionary`; -1 until it is read
+_ACTIVE_DICT_ID = -1
+
+# first path segments of PFR URLs reported as page types by `page_type`
+PAGE_TYPES = ('boxscores', 'players', 'teams', 'play-index', 'years',
+              'coaches', 'officials')
+
+
+# metadata about a cached page:
+# * url - the URL of the page
+# * fetched - the time the page was last fetched or revalidated
+# * validators - dict of the response's 'etag' and/or 'last_modified'
+# * size - the number of bytes used to store the page
+# * accessed - the time the page was last read from the cache (to within
+#   ACCESS_RESOLUTION)
+# * key - the name the store keeps the page under, used by
+#   `CacheStore.discard` (None if it is the URL)
+# The URL is None for pages cached without a record of it, such as pages in
+# a FileCacheStore written before it kept metadata.
+CacheEntry = collections.namedtuple(
+    'CacheEntry', ['url', 'fetched', 'validators', 'size', 'accessed', 'key'],
+    defaults=[None])
+
+
+def cache_dir():
+    """Returns the directory holding the HTML cache, creating it if needed."""
+    path = appdirs.user_cache_dir('nfl_stats', getpass.getuser())
+    if not os.path.isdir(path):
+        os.makedirs(path, exist_ok=True)
+    return path
+
+
+def url_hash(url):
+    """Returns the hex digest used to identify a URL in the cache."""
+    # hash based on the URL
+    file_hash = hashlib.md5()
+    encoded_url = url.encode(errors='replace')
+    file_hash.update(encoded_url)
+    return file_hash.hexdigest()
+
+
+def _zstd_dict(dict_id):
+    if dict_id not in _ZSTD_DICTS:
+        with open(_dict_path(dict_id), 'rb') as f:
+            _ZSTD_DICTS[dict_id] = zstandard.ZstdCompressionDict(f.read())
+    return _ZSTD_DICTS[dict_id]
+
+
+def _dict_path(dict_id):
+    return os.path.join(cache_dir(), 'zstd-{}.dict'.format(dict_id))
+
+
+def _active_dict_id():
+    global _ACTIVE_DICT_ID
+    if _ACTIVE_DICT_ID == -1:
+        try:
+            with open(os.path.join(cache_dir(), 'zstd.dict-id')) as f:
+                _ACTIVE_DICT_ID = int(f.read())
+        except (OSError, ValueError):
+            _ACTIVE_DICT_ID = None
+    return _ACTIVE_DICT_ID
+
+
+def _zstd_compressor():
+    dict_id = _active_dict_id()
+    if getattr(_ZSTD_LOCAL, 'dict_id', -1) != dict_id:
+        zdict = _zstd_dict(dict_id) if dict_id else None
+        _ZSTD_LOCAL.compressor = zstandard.ZstdCompressor(
+            level=ZSTD_LEVEL, dict_data=zdict)
+        _ZSTD_LOCAL.dict_id = dict_id
+    return _ZSTD_LOCAL.compressor
+
+
+def compress(data):
+    """Compresses a cached page with zstd (using the trained dictionary, if
+    there is one) or, if zstandard is not installed, with gzip.
+    """
+    if zstandard is not None:
+        return _zstd_compressor().compress(data)
+    return gzip.compress(data, GZIP_LEVEL)
+
+
+def decompress(data):
+    """Decompresses a cached page written by `compress`. Data that is not
+    compressed is returned unchanged, so older caches remain readable.
+    """
+    if data.startswith(_ZSTD_MAGIC):
+        if zstandard is None:
+            raise RuntimeError('the zstandard package is needed to read this '
+                               'cache')
+        dict_id = zstandard.get_frame_parameters(data).dict_id
+        zdict = _zstd_dict(dict_id) if dict_id else None
+        return zstandard.ZstdDecompressor(dict_data=zdict).decompress(data)
+    if data.startswith(_GZIP_MAGIC):
+        return gzip.decompress(data)
+    return data
+
+
+def train_dictionary(store=None, samples=1000, size=112640):
+    """Trains a zstd dictionary on pages in the cache. Pages cached from then
+    on are compressed with it, which shrinks similar pages much further than
+    compressing each on its own. Earlier dictionaries are kept so that pages
+    compressed with them can still be read. Other processes already running
+    keep compressing with the dictionary they started with.
+    :store: the store to take sample pages from. Defaults to `get_store()`.
+    :samples: the maximum number of pages to train on.
+    :size: the size of the dictionary, in bytes.
+    :returns: the ID of the new dictionary.
+    """
+    if zstandard is None:
+        raise RuntimeError('the zstandard package is needed to train a '
+                           'dictionary')
+    store = store or get_store()
+    known = (entry for entry in store.entries() if entry.url is not None)
+    pages = [store.read(entry.url).encode('utf-8')
+             for entry in itertools.islice(known, samples)]
+    zdict = zstandard.train_dictionary(size, pages, level=ZSTD_LEVEL)
+    dict_id = zdict.dict_id()
+    with open(_dict_path(dict_id), 'wb') as f:
+        f.write(zdict.as_bytes())
+    with open(os.path.join(cache_dir(), 'zstd.dict-id'), 'w') as f:
+        f.write(str(dict_id))
+    global _ACTIVE_DICT_ID
+    _ACTIVE_DICT_ID = dict_id
+    return dict_id
+
+
+def atomic_write(filename, data):
+    # write to a temporary file in the same directory and rename it over the
+    # target, so readers in other processes never see a partly written file
+    fd, tmp_name = tempfile.mkstemp(dir=os.path.dirname(filename),
+                                    prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_name, filename)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+
+
+def local_connection(local, path, timeout, schema, migrate=None):
+    """Returns the calling thread's connection to an SQLite database in WAL
+    mode, so that many processes can read while one writes. Connections
+    can't be shared between threads or across a fork, so a new one is
+    opened in each thread, and again after a fork.
+    :local: the threading.local keeping the connections.
+    :path: the database file.
+    :timeout: seconds to wait for another writer to finish.
+    :schema: the SQL script creating the tables, run on each new connection.
+    :migrate: a function updating older databases, called with each new
+        connection after the schema is created.
+    :returns: the sqlite3.Connection, in autocommit mode.
+    """
+    pid, conn = getattr(local, 'conn', (None, None))
+    if conn is None or pid != os.getpid():
+        conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(schema)
+        if migrate is not None:
+            migrate(conn)
+        local.conn = (os.getpid(), conn)
+    return conn
+
+
+def page_type(url):
+    """Returns the type of a page for cache statistics, e.g. 'boxscores' or
+    'play-index', or 'other' for pages not in PAGE_TYPES.
+    """
+    first = urlparse(url).path.strip('/').split('/')[0]
+    return first if first in PAGE_TYPES else 'other'
+
+
+class CacheStats:
+    """Thread-safe counters of cache events (e.g. 'hits', 'misses'),
+    grouped by a key such as the page type or the memoized function.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = collections.defaultdict(collections.Counter)
+
+    def __repr__(self):
+        return 'CacheStats({})'.format(self.totals())
+
+    def add(self, key, event, n=1):
+        """Adds `n` to the count of `event` for `key`."""
+        with self._lock:
+            self._counts[key][event] += n
+
+    def counts(self):
+        """Returns a dict mapping each key to a dict of its event counts."""
+        with self._lock:
+            return {key: dict(c) for key, c in self._counts.items()}
+
+    def totals(self):
+        """Returns a dict of the event counts summed over all keys."""
+        totals = collections.Counter()
+        for c in self.counts().values():
+            totals.update(c)
+        return dict(totals)
+
+    def reset(self):
+        """Sets all counts back to zero."""
+        with self._lock:
+            self._counts.clear()
+
+    def report(self, events, sort_by=None):
+        """Formats the counts as a table with a row per key.
+        :events: the events to show as columns, in order.
+        :sort_by: the event to sort rows by, in decreasing order. Defaults to
+            the first of `events`.
+        :returns: the table as a string.
+        """
+        counts = self.counts()
+        sort_by = sort_by or events[0]
+        keys = sorted(counts, key=lambda k: -counts[k].get(sort_by, 0))
+        width = max([len(str(k)) for k in keys] + [5])
+        lines = ['{:<{}}'.format('', width) +
+                 ''.join('{:>14}'.format(e) for e in events)]
+        for key, c in [(k, counts[k]) for k in keys] + \
+                [('total', self.totals())]:
+            lines.append('{:<{}}'.format(str(key), width) +
+                         ''.join('{:>14}'.format(c.get(e, 0))
+                                 for e in events))
+        return '\n'.join(lines)
+
+
+class CacheStore:
+    """Base class for the storage behind the HTML cache. Stores only keep
+    pages and their metadata; deciding whether a page is fresh is left to
+    `decorators.cache_html`.
+    """
+
+    def info(self, url):
+        """Returns the CacheEntry for a URL, or None if it is not cached."""
+        raise NotImplementedError
+
+    def read(self, url):
+        """Returns the cached HTML for a URL, or None if it is not cached."""
+        raise NotImplementedError
+
+    def write(self, url, text, validators=None):
+        """Stores the HTML for a URL, marking it as fetched now."""
+        raise NotImplementedError
+
+    def touch(self, url):
+        """Marks the cached copy of a URL as fetched now."""
+        raise NotImplementedError
+
+    def remove(self, url):
+        """Removes a URL from the cache, if present."""
+        raise NotImplementedError
+
+    def discard(self, entry):
+        """Removes the page of a CacheEntry returned by the store."""
+        self.remove(entry.url)
+
+    def entries(self):
+        """Iterates over the CacheEntry of every cached page."""
+        raise NotImplementedError
+
+    def fetched_before(self, timestamp):
+        """Iterates over the CacheEntry of every page last fetched before
+        `timestamp`.
+        """
+        return (e for e in self.entries() if e.fetched < timestamp)
+
+    def accessed_before(self, timestamp):
+        """Iterates over the CacheEntry of every page last read before
+        `timestamp`.
+        """
+        return (e for e in self.entries() if e.accessed < timestamp)
+
+    def least_recently_used(self):
+        """Iterates over the CacheEntry of every cached page, least recently
+        read first. Used by `evict`, which stops as soon as it has found
+        enough pages to remove, so stores should produce entries lazily.
+        """
+        return iter(sorted(self.entries(), key=lambda e: e.accessed))
+
+    def total_size(self):
+        """Returns the number of bytes used to store all cached pages."""
+        return sum(e.size for e in self.entries())
+
+    def compact(self):
+        """Reclaims space left behind by removed pages.
+        :returns: the number of bytes reclaimed.
+        """
+        return 0
+
+
+class FileCacheStore(CacheStore):
+    """Stores each page as a file named after the hash of its URL, with its
+    metadata in a `.meta` JSON file alongside. The fetch time is the file's
+    modification time and the last access time is its access time.
+
+    Pages cached before metadata was kept have no `.meta` file; their URL is
+    unknown, so they are listed with a URL of None and treated as stale.
+    """
+
+    # names of page files: the hex digest of `url_hash`
+    _PAGE_RE = re.compile(r'^[0-9a-f]{32}$')
+
+    def __init__(self, path=None, compressed=True):
+        """
+        :path: the cache directory. Defaults to the user cache directory.
+        :compressed: if True, pages are compressed when written.
+        """
+        self.path = path or cache_dir()
+        self.compressed = compressed
+
+    def __repr__(self):
+        return 'FileCacheStore({!r})'.format(self.path)
+
+    def _filename(self, url):
+        return os.path.join(self.path, url_hash(url))
+
+    def _read_meta(self, filename):
+        try:
+            with open(filename + '.meta', 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def info(self, url):
+        filename = self._filename(url)
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return None
+        meta = self._read_meta(filename)
+        return CacheEntry(url, stat.st_mtime, meta.get('validators', {}),
+                          stat.st_size, stat.st_atime)
+
+    def read(self, url):
+        filename = self._filename(url)
+        try:
+            with open(filename, 'rb') as f:
+                data = f.read()
+                self._record_access(f)
+        except OSError:
+            return None
+        return decompress(data).decode('utf-8', errors='replace')
+
+    @staticmethod
+    def _record_access(f):
+        # record the access ourselves, as filesystems are often mounted so
+        # that reads don't update it. This goes through the open file rather
+        # than its name, which `write` may meanwhile have pointed at a new
+        # page whose fetch time would then be overwritten; where that isn't
+        # supported, the access is left to the filesystem
+        if os.utime not in os.supports_fd:
+            return
+        stat = os.fstat(f.fileno())
+        now = time.time()
+        if now - stat.st_atime > ACCESS_RESOLUTION:
+            try:
+                os.utime(f.fileno(), (now, stat.st_mtime))
+            except OSError:
+                pass
+
+    def write(self, url, text, validators=None):
+        filename = self._filename(url)
+        data = text.encode('utf-8')
+        # the body goes first: until the metadata is replaced, a reader may
+        # pair the new body with old validators, which at worst causes a
+        # needless download, whereas the reverse could revalidate a stale body
+        atomic_write(filename, compress(data) if self.compressed else data)
+        meta = {'url': url, 'validators': validators or {}}
+        atomic_write(filename + '.meta', json.dumps(meta).encode('utf-8'))
+
+    def touch(self, url):
+        os.utime(self._filename(url), None)
+
+    def remove(self, url):
+        self._remove_file(self._filename(url))
+
+    def discard(self, entry):
+        self._remove_file(os.path.join(self.path, entry.key))
+
+    @staticmethod
+    def _remove_file(filename):
+        for fn in (filename, filename + '.meta'):
+            if os.path.isfile(fn):
+                os.remove(fn)
+
+    def _pages(self):
+        # the name and stat of every page file; the metadata is only read
+        # for the pages that are listed
+        with os.scandir(self.path) as it:
+            for dir_entry in it:
+                if not self._PAGE_RE.match(dir_entry.name):
+                    continue
+                try:
+                    yield dir_entry.name, dir_entry.stat()
+                except OSError:
+                    continue
+
+    def _entry(self, fn, stat):
+        meta = self._read_meta(os.path.join(self.path, fn))
+        return CacheEntry(meta.get('url'), stat.st_mtime,
+                          meta.get('validators', {}), stat.st_size,
+                          stat.st_atime, fn)
+
+    def entries(self):
+        return (self._entry(fn, stat) for fn, stat in self._pages())
+
+    def fetched_before(self, timestamp):
+        return (self._entry(fn, stat) for fn, stat in self._pages()
+                if stat.st_mtime < timestamp)
+
+    def accessed_before(self, timestamp):
+        return (self._entry(fn, stat) for fn, stat in self._pages()
+                if stat.st_atime < timestamp)
+
+    def least_recently_used(self):
+        pages = sorted(self._pages(), key=lambda page: page[1].st_atime)
+        return (self._entry(fn, stat) for fn, stat in pages)
+
+    def total_size(self):
+        return sum(stat.st_size for _, stat in self._pages())
+
+    def compact(self):
+        # remove temporary files left by interrupted writes, and metadata
+        # whose page is gone
+        reclaimed = 0
+        cutoff = time.time() - 3600
+        for fn in os.listdir(self.path):
+            path = os.path.join(self.path, fn)
+            try:
+                if fn.startswith('.tmp-'):
+                    stale = os.path.getmtime(path) < cutoff
+                elif fn.endswith('.meta'):
+                    stale = not os.path.isfile(path[:-len('.meta')])
+                else:
+                    continue
+                if stale:
+                    size = os.path.getsize(path)
+                    os.remove(path)
+                    reclaimed += size
+            except OSError:
+                continue
+        return reclaimed
+
+
+class SQLiteCacheStore(CacheStore):
+    """Stores pages and their metadata in a single SQLite database, in WAL
+    mode so that many processes can read while one writes. Lookups are a
+    single read by primary key, and the fetch and access times are indexed
+    so that expiry and inspection are SQL queries rather than directory
+    walks.
+    """
+
+    _SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY,
+            fetched REAL NOT NULL,
+            validators TEXT,
+            size INTEGER NOT NULL,
+            body BLOB NOT NULL,
+            accessed REAL
+        );
+        CREATE INDEX IF NOT EXISTS pages_fetched ON pages (fetched);
+    '''
+    _COLUMNS = 'url, fetched, validators, size, accessed'
+
+    def __init__(self, path=None, timeout=30., compressed=True):
+        """
+        :path: the database file. Defaults to `html.sqlite` in the user cache
+            directory.
+        :timeout: seconds to wait for another writer to finish.
+        :compressed: if True, pages are compressed when written.
+        """
+        self.path = path or os.path.join(cache_dir(), 'html.sqlite')
+        self.timeout = timeout
+        self.compressed = compressed
+        # this store's connection in each thread, see `local_connection`
+        self._local = threading.local()
+
+    def __repr__(self):
+        return 'SQLiteCacheStore({!r})'.format(self.path)
+
+    def __getstate__(self):
+        return {'path': self.path, 'timeout': self.timeout,
+                'compressed': self.compressed}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    @property
+    def conn(self):
+        return local_connection(self._local, self.path, self.timeout,
+                                self._SCHEMA, self._migrate)
+
+    @staticmethod
+    def _migrate(conn):
+        columns = [r[1] for r in conn.execute('PRAGMA table_info(pages)')]
+        if 'accessed' not in columns:
+            conn.execute('ALTER TABLE pages ADD COLUMN accessed REAL')
+            conn.execute('UPDATE pages SET accessed = fetched')
+        conn.execute('CREATE INDEX IF NOT EXISTS pages_accessed'
+                     ' ON pages (accessed)')
+
+    @staticmethod
+    def _entry(row):
+        url, fetched, validators, size, accessed = row
+        return CacheEntry(url, fetched, json.loads(validators or '{}'), size,
+                          fetched if accessed is None else accessed)
+
+    def info(self, url):
+        row = self.conn.execute(
+            'SELECT {} FROM pages WHERE url = ?'.format(self._COLUMNS),
+            (url,)).fetchone()
+        return self._entry(row) if row else None
+
+    def read(self, url):
+        row = self.conn.execute(
+            'SELECT body, accessed FROM pages WHERE url = ?',
+            (url,)).fetchone()
+        if row is None:
+            return None
+        body, accessed = row
+        now = time.time()
+        if accessed is None or now - accessed > ACCESS_RESOLUTION:
+            self.conn.execute('UPDATE pages SET accessed = ? WHERE url = ?',
+                              (now, url))
+        return decompress(bytes(body)).decode('utf-8', errors='replace')
+
+    def write(self, url, text, validators=None):
+        body = text.encode('utf-8')
+        if self.compressed:
+            body = compress(body)
+        now = time.time()
+        self.conn.execute(
+            'INSERT OR REPLACE INTO pages'
+            ' (url, fetched, validators, size, body, accessed)'
+            ' VALUES (?, ?, ?, ?, ?, ?)',
+            (url, now, json.dumps(validators or {}), len(body), body, now))
+
+    def touch(self, url):
+        self.conn.execute('UPDATE pages SET fetched = ? WHERE url = ?',
+                          (time.time(), url))
+
+    def remove(self, url):
+        self.conn.execute('DELETE FROM pages WHERE url = ?', (url,))
+
+    def entries(self):
+        rows = self.conn.execute(
+            'SELECT {} FROM pages'.format(self._COLUMNS)).fetchall()
+        return (self._entry(row) for row in rows)
+
+    def fetched_before(self, timestamp):
+        rows = self.conn.execute(
+            'SELECT {} FROM pages WHERE fetched < ? ORDER BY fetched'
+            .format(self._COLUMNS), (timestamp,)).fetchall()
+        return (self._entry(row) for row in rows)
+
+    def accessed_before(self, timestamp):
+        rows = self.conn.execute(
+            'SELECT {} FROM pages WHERE accessed < ? ORDER BY accessed'
+            .format(self._COLUMNS), (timestamp,)).fetchall()
+        return (self._entry(row) for row in rows)
+
+    def least_recently_used(self):
+        # read from the index as the entries are consumed
+        rows = self.conn.execute(
+            'SELECT {} FROM pages ORDER BY accessed'.format(self._COLUMNS))
+        return (self._entry(row) for row in rows)
+
+    def total_size(self):
+        return self.conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+
+    def compact(self):
+        before = os.path.getsize(self.path)
+        self.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        self.conn.execute('VACUUM')
+        return max(0, before - os.path.getsize(self.path))
+
+
+class SharedMemoStore:
+    """Stores small memoized results in an SQLite database, so that worker
+    processes sharing the cache directory compute each result only once.
+    Used by `decorators.memoize` for functions declared with `shared=True`.
+    """
+
+    _SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS memo (
+            key TEXT PRIMARY KEY,
+            created REAL NOT NULL,
+            value BLOB NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS memo_created ON memo (created);
+    '''
+
+    def __init__(self, path=None, ttl=24 * 60 * 60, max_bytes=2 ** 20,
+                 timeout=30.):
+        """
+        :path: the database file. Defaults to `memo.sqlite` in the user cache
+            directory.
+        :ttl: seconds a stored result stays valid.
+        :max_bytes: the largest result stored, pickled; larger results are
+            only kept by the process that computed them.
+        :timeout: seconds to wait for another writer to finish.
+        """
+        self.path = path or os.path.join(cache_dir(), 'memo.sqlite')
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def __repr__(self):
+        return 'SharedMemoStore({!r})'.format(self.path)
+
+    def __getstate__(self):
+        return {'path': self.path, 'ttl': self.ttl,
+                'max_bytes': self.max_bytes, 'timeout': self.timeout}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    @property
+    def conn(self):
+        return local_connection(self._local, self.path, self.timeout,
+                                self._SCHEMA)
+
+    def get(self, key):
+        """Returns the result stored for `key`, raising KeyError if there is
+        no valid one.
+        """
+        row = self.conn.execute(
+            'SELECT value FROM memo WHERE key = ? AND created >= ?',
+            (key, time.time() - self.ttl)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return pickle.loads(bytes(row[0]))
+
+    def put(self, key, value):
+        """Stores the result for `key`, unless it is too large or can't be
+        pickled.
+        :returns: True if the result was stored.
+        """
+        try:
+            data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return False
+        if len(data) > self.max_bytes:
+            return False
+        now = time.time()
+        self.conn.execute('DELETE FROM memo WHERE created < ?',
+                          (now - self.ttl,))
+        self.conn.execute('INSERT OR REPLACE INTO memo (key, created, value)'
+                          ' VALUES (?, ?, ?)', (key, now, data))
+        return True
+
+    def clear(self):
+        """Removes all stored results."""
+        self.conn.execute('DELETE FROM memo')
+
+
+# the store used by decorators.cache_html
+_STORE = None
+# the store used by decorators.memoize for shared results
+_MEMO_STORE = None
+
+
+def get_store():
+    """Returns the store used for the HTML cache. Defaults to a
+    FileCacheStore in the user cache directory.
+    """
+    global _STORE
+    if _STORE is None:
+        _STORE = FileCacheStore()
+    return _STORE
+
+
+def get_memo_store():
+    """Returns the store for memoized results shared between processes.
+    Defaults to a SharedMemoStore in the user cache directory.
+    """
+    global _MEMO_STORE
+    if _MEMO_STORE is None:
+        _MEMO_STORE = SharedMemoStore()
+    return _MEMO_STORE
+
+
+def set_store(store):
+    """Sets the store used for the HTML cache, e.g.
+    `set_store(SQLiteCacheStore())`. Set it before forking any workers so
+    they all use the same store.
+    """
+    global _STORE
+    _STORE = store
+
+
+def evict(store=None, max_bytes=None, max_idle_days=None, is_stale=None):
+    """Removes pages from the cache to keep it within its limits. Pages not
+    read for `max_idle_days` are removed first; then, while the cache is
+    over `max_bytes`, stale pages are removed before fresh ones, least
+    recently used first. Pages are found with the store's
+    `accessed_before`, `total_size` and `least_recently_used` queries, so
+    only as many pages are looked at as need to be.
+    :store: the store to evict from. Defaults to `get_store()`.
+    :max_bytes: the disk budget in bytes. Defaults to MAX_CACHE_BYTES.
+    :max_idle_days: the longest a page may go unread, in days. Defaults to
+        MAX_IDLE_DAYS.
+    :is_stale: a function taking a CacheEntry and returning True if the page
+        is due to be refetched. Defaults to `decorators.is_stale`.
+    :returns: a list of the CacheEntry of each page removed.
+    """
+    store = store or get_store()
+    if max_bytes is None:
+        max_bytes = MAX_CACHE_BYTES
+    if max_idle_days is None:
+        max_idle_days = MAX_IDLE_DAYS
+    if is_stale is None:
+        from . import decorators
+        is_stale = decorators.is_stale
+
+    removed = []
+    if max_idle_days is not None:
+        cutoff = time.time() - max_idle_days * 24 * 60 * 60
+        removed.extend(store.accessed_before(cutoff))
+        for entry in removed:
+            store.discard(entry)
+    if max_bytes is not None:
+        excess = store.total_size() - max_bytes
+        over_budget = []
+        fresh = []
+        if excess > 0:
+            # take stale pages in order of last access until enough are
+            # found, keeping the fresh ones passed over in case they are
+            # needed too; pages whose URL is unknown can't be checked and
+            # count as stale
+            for entry in store.least_recently_used():
+                if entry.url is None or is_stale(entry):
+                    over_budget.append(entry)
+                    excess -= entry.size
+                    if excess <= 0:
+                        break
+                else:
+                    fresh.append(entry)
+        for entry in fresh:
+            if excess <= 0:
+                break
+            over_budget.append(entry)
+            excess -= entry.size
+        for entry in over_budget:
+            store.discard(entry)
+        removed.extend(over_budget)
+    return removed
+
+
+def compact(store=None, **evict_kwargs):
+    """Evicts pages from the cache (see `evict`) and then compacts the store,
+    reclaiming the space left behind.
+    :store: the store to compact. Defaults to `get_store()`.
+    :returns: a tuple of the list of CacheEntry removed and the number of
+        bytes reclaimed by compacting the store.
+    """
+    store = store or get_store()
+    removed = evict(store, **evict_kwargs)
+    return removed, store.compact()
@@ -0,0 +1,134 @@
+"""Maintenance commands for the HTML cache.
+
+Usage:
+    python -m nfl_stats.cachetool [--store {file,sqlite}] [--path PATH]
+        evict [--max-size 5G] [--max-idle-days 180]
+    python -m nfl_stats.cachetool [--store {file,sqlite}] [--path PATH]
+        stats [--by {type,class}]
+"""
+import argparse
+import collections
+import re
+import time
+
+from . import cache
+from . import decorators
+from . import framecache
+from . import ttl
+
+_SIZE_UNITS = {'': 1, 'K': 2 ** 10, 'M': 2 ** 20, 'G': 2 ** 30, 'T': 2 ** 40}
+
+# upper bounds in days of the age buckets reported by `stats`
+_AGE_BUCKETS = ((1, '<1d'), (7, '<7d'), (30, '<30d'), (90, '<90d'),
+                (365, '<1y'), (float('inf'), '>=1y'))
+
+
+def parse_size(text):
+    """Parses a size such as '500M' or '5G' into a number of bytes."""
+    m = re.match(r'^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*$', text, re.I)
+    if not m:
+        raise argparse.ArgumentTypeError('invalid size: {}'.format(text))
+    return int(float(m.group(1)) * _SIZE_UNITS[m.group(2).upper()])
+
+
+def format_size(n_bytes):
+    """Formats a number of bytes for display, e.g. '1.5 GB'."""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(n_bytes) < 1024:
+            return '{:.1f} {}'.format(n_bytes, unit)
+        n_bytes /= 1024
+    return '{:.1f} TB'.format(n_bytes)
+
+
+def _get_store(args):
+    if args.store == 'sqlite':
+        return cache.SQLiteCacheStore(args.path)
+    return cache.FileCacheStore(args.path)
+
+
+def evict(args):
+    store = _get_store(args)
+    removed, reclaimed = cache.compact(
+        store, max_bytes=args.max_size, max_idle_days=args.max_idle_days,
+        is_stale=decorators.is_stale)
+    stale = sum(1 for e in removed if decorators.is_stale(e))
+    print('Removed {} pages ({}) from {}: {} stale, {} fresh'.format(
+        len(removed), format_size(sum(e.size for e in removed)), store,
+        stale, len(removed) - stale))
+    if args.verbose:
+        for entry in removed:
+            print('  {}'.format(entry.url or entry.key))
+    print('Compaction reclaimed {}'.format(format_size(reclaimed)))
+    if args.max_idle_days is not None:
+        freed = framecache.prune(args.max_idle_days)
+        print('Pruned idle parsed tables: {}'.format(format_size(freed)))
+
+
+def stats(args):
+    store = _get_store(args)
+    group = cache.page_type if args.by == 'type' else ttl.url_class
+    now = time.time()
+    rows = collections.defaultdict(collections.Counter)
+    for entry in store.entries():
+        # pages cached without a record of their URL
+        row = rows[group(entry.url) if entry.url is not None else 'unknown']
+        row['pages'] += 1
+        row['size'] += entry.size
+        row['stale'] += decorators.is_stale(entry)
+        age_days = (now - entry.fetched) / 86400
+        row[next(label for bound, label in _AGE_BUCKETS
+                 if age_days < bound)] += 1
+    total = collections.Counter()
+    for row in rows.values():
+        total.update(row)
+
+    ages = [label for _, label in _AGE_BUCKETS]
+    width = max([len(key) for key in rows] + [5])
+    print('{} in {}'.format('Pages by ' + args.by, store))
+    print('{:<{}}{:>8}{:>11}{:>7}'.format('', width, 'pages', 'size',
+                                         'stale') +
+          ''.join('{:>7}'.format(a) for a in ages))
+    for key, row in sorted(rows.items(), key=lambda kv: -kv[1]['size']) + \
+            [('total', total)]:
+        print('{:<{}}{:>8}{:>11}{:>7}'.format(
+            key, width, row['pages'], format_size(row['size']),
+            row['stale']) +
+            ''.join('{:>7}'.format(row[a]) for a in ages))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m nfl_stats.cachetool',
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument('--store', choices=('file', 'sqlite'),
+                        default='file', help='the kind of cache store')
+    parser.add_argument('--path', help='the cache directory or database '
+                                       '(defaults to the user cache)')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    evict_parser = subparsers.add_parser(
+        'evict', help='remove pages to keep the cache within its limits, '
+                      'then compact it')
+    evict_parser.add_argument('--max-size', type=parse_size,
+                              help='disk budget, e.g. 500M or 5G')
+    evict_parser.add_argument('--max-idle-days', type=float,
+                              help='remove pages not read for this many days')
+    evict_parser.add_argument('-v', '--verbose', action='store_true',
+                              help='list the URLs removed')
+    evict_parser.set_defaults(func=evict)
+
+    stats_parser = subparsers.add_parser(
+        'stats', help='summarize the cached pages by page type, with their '
+                      'size, staleness and age')
+    stats_parser.add_argument('--by', choices=('type', 'class'),
+                              default='type',
+                              help="group pages by page type, or by the URL "
+                                   "class used to learn TTLs")
+    stats_parser.set_defaults(func=stats)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
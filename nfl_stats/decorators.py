@@ -1,136 +1,641 @@
+import collections
 import copy
 import datetime
-import getpass
-import hashlib
+import functools
+import inspect
+import itertools
 import os
-import re
+import sys
+import threading
 import time
-import appdirs
+import weakref
 from boltons import funcutils
-import mementos
+import numpy as np
+import pandas as pd
 from pyquery import PyQuery as pq
 
-def _days_valid_pfr(url):
-    # boxscores are static, but refresh quarterly to be sure
-    if 'boxscore' in url:
-        return 90
-    # important dates
-    today = datetime.date.today()
-    start_of_season = datetime.date(today.year, 8, 15)
-    end_of_season = datetime.date(today.year, 2, 15)
-    # check for a year in the filename
-    m = re.search(r'(\d{4})', url)
-    if m:
-        # if it was a year prior to the current season, we're good
-        year = int(m.group(1))
-        cur_season = today.year - (today <= end_of_season)
-        if year < cur_season:
-            return 90
-    # if it's the offseason, refresh cache twice a month
-    if end_of_season < today < start_of_season:
-        return 15
-    # otherwise, refresh every 2 days
-    return 2
+from . import cache
+from . import ttl
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+# counts of this process's HTML cache events by page type (see
+# cache.page_type), and of memoized function calls by function
+HTML_STATS = cache.CacheStats()
+MEMO_STATS = cache.CacheStats()
+
+def _sport_id(url, warn=True):
+    if url.startswith(
+        ('https://www.pro-football-reference.com',
+         'http://www.nflpenalties.com',
+         'https://www.teamrankings.com/nfl/')):
+        return 'pfr'
+    if warn:
+        print('No sport ID found for {}, not able to check cache'.format(url))
+    return None
+
+
+def _is_fresh(url, entry, warn=True):
+    sport_id = _sport_id(url, warn)
+    if not sport_id:
+        return False
+    days_since_mod = (time.time() - entry.fetched) / 86400
+    return days_since_mod < ttl.get_policy().days_valid(url)
+
+
+def is_stale(entry):
+    """Returns True if a cached page is due to be refetched.
+    :entry: the cache.CacheEntry of the page. Pages whose URL is unknown
+        are always stale.
+    """
+    return entry.url is None or not _is_fresh(entry.url, entry, warn=False)
+
+
+def read_cached_html(url, allow_stale=False):
+    """Reads the cached HTML for a URL from the cache used by `cache_html`.
+    :url: the absolute URL of the page.
+    :allow_stale: if True, returns the cached copy even if it is stale.
+    :returns: the cached HTML, or None if the page is not cached or the cached
+        copy is stale.
+    """
+    store = cache.get_store()
+    if not allow_stale:
+        entry = store.info(url)
+        if entry is None or not _is_fresh(url, entry):
+            return None
+    text = store.read(url)
+    if text is not None and not allow_stale:
+        ptype = cache.page_type(url)
+        HTML_STATS.add(ptype, 'hits')
+        HTML_STATS.add(ptype, 'bytes_read', len(text))
+    return text
+
+
+def cached_validators(url):
+    """Returns the response validators stored with the cached copy of a URL,
+    which can be used to make a conditional request for the page.
+    :url: the absolute URL of the page.
+    :returns: a dict with 'etag' and/or 'last_modified' keys. Empty if the
+        page is not cached or no validators were stored for it.
+    """
+    entry = cache.get_store().info(url)
+    return entry.validators if entry else {}
+
+
+def write_cached_html(url, text, validators=None):
+    """Stores the HTML for a URL in the cache used by `cache_html`.
+    :url: the absolute URL of the page.
+    :text: the HTML of the page.
+    :validators: a dict of the response validators ('etag', 'last_modified')
+        for the page, if any.
+    """
+    store = cache.get_store()
+    store.write(url, text, validators)
+    ttl.get_policy().observe(url, text)
+    ptype = cache.page_type(url)
+    HTML_STATS.add(ptype, 'misses')
+    HTML_STATS.add(ptype, 'bytes_fetched', len(text))
+    if _sport_id(url, warn=False) is None:
+        # never served from the cache, see _is_fresh
+        HTML_STATS.add(ptype, 'uncacheable')
+    # keep the cache within its configured limits
+    if ((cache.MAX_CACHE_BYTES is not None or cache.MAX_IDLE_DAYS is not None)
+            and next(_WRITE_COUNT) % cache.EVICT_INTERVAL == 0):
+        _evict_in_background(store)
+
+
+def _evict_in_background(store):
+    # writes happen while the page's FillLock is held, so eviction runs in
+    # its own thread instead of keeping other requests for the page waiting;
+    # a run still going when the next one is due makes that one unnecessary
+    if not _EVICT_LOCK.acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            cache.evict(store, is_stale=is_stale)
+        except Exception as e:
+            print('Automatic cache eviction failed: {}'.format(e))
+        finally:
+            _EVICT_LOCK.release()
+
+    threading.Thread(target=run, name='nfl_stats-evict', daemon=True).start()
+
+
+def touch_cached_html(url):
+    """Marks the cached copy of a URL as fetched now, for when the server has
+    confirmed that the page has not changed.
+    :url: the absolute URL of the page.
+    """
+    cache.get_store().touch(url)
+    ttl.get_policy().observe(url)
+    ptype = cache.page_type(url)
+    HTML_STATS.add(ptype, 'misses')
+    HTML_STATS.add(ptype, 'revalidated')
+
+
+def stats_report():
+    """Returns a summary of this process's cache statistics: hits and misses
+    of the HTML cache by page type, and of each memoized function.
+    """
+    return '\n'.join([
+        'HTML cache:',
+        HTML_STATS.report(('hits', 'misses', 'revalidated', 'uncacheable',
+                           'bytes_read', 'bytes_fetched')),
+        '',
+        'Memoized functions:',
+        MEMO_STATS.report(('hits', 'misses', 'shared_hits')),
+    ])
+
+
+# number of pages written to the cache by this process
+_WRITE_COUNT = itertools.count(1)
+# held while automatic eviction runs in the background
+_EVICT_LOCK = threading.Lock()
+
+# per-URL locks for threads of this process filling the cache, with the number
+# of threads holding or waiting on each
+_FILL_LOCKS = {}
+_FILL_LOCKS_LOCK = threading.Lock()
+
+# file holding byte-range locks for processes filling the cache; record locks
+# belong to the process and are all dropped when any descriptor for the file
+# is closed, so one descriptor is kept open per process
+_LOCK_FILE = None
+_LOCK_FILE_PID = None
+
+
+def _lock_file():
+    global _LOCK_FILE, _LOCK_FILE_PID
+    if _LOCK_FILE is None or _LOCK_FILE_PID != os.getpid():
+        _LOCK_FILE = open(os.path.join(cache.cache_dir(), 'fill.lock'), 'a')
+        _LOCK_FILE_PID = os.getpid()
+    return _LOCK_FILE
+
+
+class FillLock:
+    """A lock held while a URL is fetched into the cache, so that concurrent
+    requests for the same page, from threads of this process or from other
+    processes sharing the cache directory, wait for a single download instead
+    of each making their own.
+
+    Can be used as a context manager, or acquired and released from different
+    threads (as the async fetch engine does).
+    """
+
+    def __init__(self, url):
+        self.key = cache.url_hash(url)
+        # byte of the lock file that stands for this URL
+        self._offset = int(self.key[:15], 16)
+
+    def acquire(self):
+        with _FILL_LOCKS_LOCK:
+            lock, count = _FILL_LOCKS.get(self.key, (None, 0))
+            if lock is None:
+                lock = threading.Lock()
+            _FILL_LOCKS[self.key] = (lock, count + 1)
+        lock.acquire()
+        if fcntl is not None:
+            fcntl.lockf(_lock_file(), fcntl.LOCK_EX, 1, self._offset)
+
+    def release(self):
+        if fcntl is not None:
+            fcntl.lockf(_lock_file(), fcntl.LOCK_UN, 1, self._offset)
+        with _FILL_LOCKS_LOCK:
+            lock, count = _FILL_LOCKS[self.key]
+            if count == 1:
+                del _FILL_LOCKS[self.key]
+            else:
+                _FILL_LOCKS[self.key] = (lock, count - 1)
+        lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
 
 
 def cache_html(func):
     """Caches the HTML returned by the specified function `func`. Caches it in
-    the user cache determined by the appdirs package.
-    """
+    the store returned by `cache.get_store()`, by default files in the user
+    cache determined by the appdirs package. Concurrent calls for the
+    same URL make only one call to `func`; the others wait for its result.
 
-    cache_dir = appdirs.user_cache_dir('nfl_stats', getpass.getuser())
-    if not os.path.isdir(cache_dir):
-        os.makedirs(cache_dir)
+    `func` is passed the validators of any stale cached copy as a
+    `validators` keyword argument, and must return a tuple of the HTML and
+    the new validators. If it returns None for the HTML, the stale copy is
+    taken to be unchanged and is marked as fresh.
+    """
 
-    @funcutils.wraps(func)
+    @funcutils.wraps(func, injected='validators')
     def wrapper(url, *args, **kwargs):
-        # hash based on the URL
-        file_hash = hashlib.md5()
-        encoded_url = url.encode(errors='replace')
-        file_hash.update(encoded_url)
-        file_hash = file_hash.hexdigest()
-        filename = '{}/{}'.format(cache_dir, file_hash)
-
-        if url.startswith(
-            ('https://www.pro-football-reference.com',
-             'http://www.nflpenalties.com',
-             'https://www.teamrankings.com/nfl/')):
-            sport_id = 'pfr'
-        else:
-            print('No sport ID found for {}, not able to check cache'.format(url))
-
-        # check whether cache is valid or stale
-        file_exists = os.path.isfile(filename)
-        if sport_id and file_exists:
-            cur_time = int(time.time())
-            mod_time = int(os.path.getmtime(filename))
-            days_since_mod = datetime.timedelta(seconds=(cur_time - mod_time)).days
-            days_cache_valid = globals()['_days_valid_{}'.format(sport_id)](url)
-            cache_is_valid = days_since_mod < days_cache_valid
-        else:
-            cache_is_valid = False
-
-        # if file found and cache is valid, read from file
-        if file_exists and cache_is_valid:
-            with open(filename, 'r', encoding='utf-8', errors='replace') as f:
-                text = f.read()
-        # otherwise, execute function and cache results
-        else:
-            text = func(url)
-            with open(filename, 'w+', encoding='utf-8') as f:
-                f.write(text)
+        # if the page is cached and the cache is valid, read from file
+        text = read_cached_html(url)
+        if text is not None:
+            return text
+        # otherwise, execute function and cache results, unless another
+        # thread or process did so while we waited for the lock
+        with FillLock(url):
+            text = read_cached_html(url)
+            if text is None:
+                text, validators = func(url, *args,
+                                        validators=cached_validators(url),
+                                        **kwargs)
+                if text is not None:
+                    write_cached_html(url, text, validators)
+                else:
+                    # the stale copy is unchanged, so mark it as fresh; if it
+                    # was evicted in the meantime, fetch the page in full
+                    text = read_cached_html(url, allow_stale=True)
+                    if text is not None:
+                        touch_cached_html(url)
+                    else:
+                        text, validators = func(url, *args, validators={},
+                                                **kwargs)
+                        write_cached_html(url, text, validators)
         return text
 
     return wrapper
 
 
+# the number of recently used instances of CACHED classes kept alive while
+# nothing else refers to them, so that short-lived handles such as
+# `BoxScore(bid).home()` reuse parsed state (0 to rely on weak references)
+REGISTRY_KEEP = 128
+
+# the recently used instances, least recent first, and a lock for the
+# registries of all CACHED classes
+_KEPT = collections.OrderedDict()
+_REGISTRY_LOCK = threading.RLock()
+
+
+@functools.lru_cache(maxsize=None)
+def _init_signature(cls):
+    # the signature of __init__ without `self`; inspect.signature(cls) would
+    # give the signature of Cached.__call__
+    sig = inspect.signature(cls.__init__)
+    return sig.replace(parameters=list(sig.parameters.values())[1:])
+
+
 def get_class_instance_key(cls, args, kwargs):
     """
-    Returns a unique identifier for a class instantiation.
+    Returns an identifier for a class instantiation based on the values of
+    its arguments, so that e.g. `BoxScore('201409070dal')` and
+    `BoxScore(boxscore_id='201409070dal')` give the same key.
+    """
+    try:
+        bound = _init_signature(cls).bind(*args, **kwargs)
+    except TypeError:
+        return (cls, args, frozenset(kwargs.items()))
+    bound.apply_defaults()
+    return (cls, tuple(bound.arguments.items()))
+
+
+class Cached(type):
+    """Metaclass for classes whose instances are shared: constructing an
+    instance with the same argument values as a live instance returns that
+    instance, so that identical entities share their memoized state.
+
+    The registry holds instances by weak reference, so unused instances can
+    be garbage-collected, except for the REGISTRY_KEEP most recently used.
+    """
+
+    def __init__(cls, name, bases, namespace):
+        super().__init__(name, bases, namespace)
+        cls._registry = weakref.WeakValueDictionary()
+
+    def __call__(cls, *args, **kwargs):
+        key = get_class_instance_key(cls, args, kwargs)
+        try:
+            hash(key)
+        except TypeError:
+            # unhashable arguments can't be looked up
+            return super().__call__(*args, **kwargs)
+        with _REGISTRY_LOCK:
+            instance = cls._registry.get(key)
+            if instance is None:
+                instance = super().__call__(*args, **kwargs)
+                cls._registry[key] = instance
+            if REGISTRY_KEEP > 0:
+                _KEPT[key] = instance
+                _KEPT.move_to_end(key)
+                while len(_KEPT) > REGISTRY_KEEP:
+                    _KEPT.popitem(last=False)
+        return instance
+
+
+def clear_instance_registry():
+    """Stops keeping recently used instances of CACHED classes alive, so that
+    those not referenced elsewhere can be garbage-collected.
     """
-    l = [id(cls)]
-    for arg in args:
-        l.append(id(arg))
-    l.extend((k, id(v)) for k, v in kwargs.items())
-    return tuple(sorted(l))
+    with _REGISTRY_LOCK:
+        _KEPT.clear()
 
 
 # used as a metaclass for classes that should be memoized
 # (technically not a decorator, but it's similar enough)
-CACHED = mementos.memento_factory('Cached', get_class_instance_key)
+CACHED = Cached
+
+
+# default limits for the cache of each memoized function: the number of
+# results kept, and their approximate size in bytes (None for no limit).
+# Functions can set their own, e.g. @memoize(max_entries=100)
+MEMO_MAX_ENTRIES = None
+MEMO_MAX_BYTES = None
+
+# if True, memoized results are shared with callers instead of deep-copied
+# wherever that is safe (see memoize); functions can opt in on their own with
+# @memoize(copy_free=True)
+MEMO_COPY_FREE = False
+
+# if True, functions memoized with @memoize(shared=True) also store their
+# results in cache.get_memo_store(), so that processes sharing the cache
+# directory (e.g. a pool of workers) compute each of them only once
+SHARED_MEMO = False
+
+# types whose values can be shared, as they can't be changed in place
+_IMMUTABLE_TYPES = (str, bytes, int, float, complex, bool, type(None),
+                    datetime.date, datetime.time, datetime.timedelta)
+
+# rough memory used by each element of a parsed HTML document
+_ELEMENT_BYTES = 600
+
+# the caches of all memoized functions, for clear_memo_caches
+_MEMO_CACHES = weakref.WeakSet()
+
+
+def approx_size(value):
+    """Estimates the memory used by a memoized result, in bytes. Counts the
+    elements of PyQuery documents and the deep memory usage of pandas
+    objects, and recurses into tuples, lists, sets and dicts.
+    """
+    if isinstance(value, pq):
+        return sum(_ELEMENT_BYTES for root in value for _ in root.iter())
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list, set, frozenset)):
+        return sys.getsizeof(value) + sum(approx_size(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            approx_size(k) + approx_size(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+class MemoCache:
+    """The results of a memoized function, evicted least recently used first
+    once there are more than `max_entries` of them or their approximate size
+    exceeds `max_bytes`. The most recent result is always kept.
+
+    Sizes are only computed while a byte limit is in force, so results
+    stored before a limit was set count as zero bytes.
+    """
+
+    def __init__(self, name, max_entries=None, max_bytes=None):
+        """
+        :name: the name of the memoized function.
+        :max_entries: the most results to keep. Defaults to MEMO_MAX_ENTRIES.
+        :max_bytes: the approximate memory budget for the results. Defaults
+            to MEMO_MAX_BYTES.
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+        _MEMO_CACHES.add(self)
 
+    def __repr__(self):
+        return 'MemoCache({!r}, entries={}, bytes={})'.format(
+            self.name, len(self), self.total_bytes)
 
-def memoize(fun):
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        """Returns the result stored for `key`, raising KeyError if there is
+        none.
+        """
+        with self._lock:
+            value, _ = self._data[key]
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        """Stores the result for `key`, evicting older results if the cache
+        is over its limits.
+        """
+        max_entries = (self.max_entries if self.max_entries is not None
+                       else MEMO_MAX_ENTRIES)
+        max_bytes = (self.max_bytes if self.max_bytes is not None
+                     else MEMO_MAX_BYTES)
+        size = approx_size(value) if max_bytes is not None else 0
+        with self._lock:
+            if key in self._data:
+                self.total_bytes -= self._data.pop(key)[1]
+            self._data[key] = (value, size)
+            self.total_bytes += size
+            while len(self._data) > 1 and (
+                    (max_entries is not None and
+                     len(self._data) > max_entries) or
+                    (max_bytes is not None and self.total_bytes > max_bytes)):
+                _, (_, old_size) = self._data.popitem(last=False)
+                self.total_bytes -= old_size
+
+    def discard(self, predicate):
+        """Removes the stored results for which `predicate` returns True."""
+        with self._lock:
+            for key, (value, size) in list(self._data.items()):
+                if predicate(value):
+                    del self._data[key]
+                    self.total_bytes -= size
+
+    def clear(self):
+        """Removes all stored results."""
+        with self._lock:
+            self._data.clear()
+            self.total_bytes = 0
+
+
+def _copy_result(value):
+    if isinstance(value, pq):
+        return value.clone()
+    else:
+        return copy.deepcopy(value)
+
+
+def _share_result(value):
+    # returns a memoized result without copying data that the caller can't
+    # change: immutable values as they are, numpy arrays as read-only views,
+    # pandas objects as shallow copies under copy-on-write, and containers as
+    # shallow copies of shared items. PyQuery documents can always be changed
+    # in place through their elements, so they are cloned as in `_copy_result`
+    if isinstance(value, _IMMUTABLE_TYPES):
+        return value
+    if isinstance(value, pq):
+        return value.clone()
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=not pd.get_option('mode.copy_on_write'))
+    if isinstance(value, np.ndarray):
+        view = value.view()
+        view.flags.writeable = False
+        return view
+    if isinstance(value, tuple):
+        items = [_share_result(v) for v in value]
+        return type(value)(*items) if hasattr(value, '_fields') \
+            else type(value)(items)
+    if isinstance(value, list):
+        return [_share_result(v) for v in value]
+    if isinstance(value, dict):
+        shared = copy.copy(value)
+        for k, v in value.items():
+            shared[k] = _share_result(v)
+        return shared
+    if isinstance(value, (set, frozenset)):
+        return copy.copy(value)
+    return copy.deepcopy(value)
+
+
+def _call_shared(fun, args, kwargs):
+    # returns the result of a call from the shared memo store, making the
+    # call in one process only if no other process has stored it. Results
+    # are often parsed tables, so like `framecache.frame_key` the key
+    # includes the parser and pandas versions
+    from . import utils
+    store = cache.get_memo_store()
+    key = '{}.{}{!r}{!r}:{}:{}'.format(
+        fun.__module__, fun.__qualname__, args, sorted(kwargs.items()),
+        utils.PARSER_VERSION, pd.__version__)
+    try:
+        value = store.get(key)
+    except KeyError:
+        with FillLock(key):
+            try:
+                value = store.get(key)
+            except KeyError:
+                value = fun(*args, **kwargs)
+                store.put(key, value)
+                return value
+    MEMO_STATS.add(fun.__qualname__, 'shared_hits')
+    return value
+
+
+def clear_memo_caches():
+    """Removes the stored results of every memoized function."""
+    for memo_cache in list(_MEMO_CACHES):
+        memo_cache.clear()
+
+
+def memoize(fun=None, max_entries=None, max_bytes=None, copy_free=None,
+            shared=False):
     """A decorator for memoizing functions.
 
     Only works on functions that take simple arguments - arguments that take
     list-like or dict-like arguments will not be memoized, and this function
     will raise a TypeError.
+
+    Can be used bare, or with arguments to bound the cache of the function,
+    e.g. `@memoize(max_entries=100, max_bytes=50 * 2**20)`; see MemoCache.
+    The cache is available as the `cache` attribute of the decorated
+    function, and `cache_clear()` empties it.
+
+    Methods of CACHED classes keep a cache on each instance instead, with
+    the same limits, so that results are freed with the instance; see also
+    `release`.
+
+    Each call returns a deep copy of the stored result, so callers can't
+    change it. In copy-free mode, only the parts of a result that could be
+    changed are copied: numpy arrays are returned as read-only views, and
+    DataFrames and Series as shallow copies if pandas' copy-on-write mode is
+    on (`pd.set_option('mode.copy_on_write', True)`); they are still copied
+    otherwise. PyQuery documents are always copied, as any caller could
+    change them through their elements.
+
+    :max_entries: the most results to keep. Defaults to MEMO_MAX_ENTRIES.
+    :max_bytes: the approximate memory budget for the results. Defaults to
+        MEMO_MAX_BYTES.
+    :copy_free: if True, hits are returned in copy-free mode. Defaults to
+        MEMO_COPY_FREE.
+    :shared: if True and SHARED_MEMO is set, results are also shared with
+        other processes through `cache.get_memo_store()`. Meant for small,
+        hot results such as lookup tables; arguments must have a stable
+        repr, which is part of the key.
     """
+    if fun is None:
+        return functools.partial(memoize, max_entries=max_entries,
+                                 max_bytes=max_bytes, copy_free=copy_free,
+                                 shared=shared)
+
     @funcutils.wraps(fun)
     def wrapper(*args, **kwargs):
 
-        hash_args = tuple(args)
+        # methods of CACHED classes keep their results on the instance, so
+        # that they are freed with it
+        if args and isinstance(type(args[0]), Cached):
+            memo_cache = _instance_cache(args[0])
+            hash_args = tuple(args[1:])
+        else:
+            memo_cache = cache
+            hash_args = tuple(args)
         hash_kwargs = frozenset(sorted(kwargs.items()))
         key = (hash_args, hash_kwargs)
 
-        def _copy(v):
-            if isinstance(v, pq):
-                return v.clone()
-            else:
-                return copy.deepcopy(v)
+        no_copy = copy_free if copy_free is not None else MEMO_COPY_FREE
+        _copy = _share_result if no_copy else _copy_result
 
         try:
-            ret = _copy(cache[key])
+            ret = _copy(memo_cache.get(key))
+            MEMO_STATS.add(fun.__qualname__, 'hits')
             return ret
         except KeyError:
-            cache[key] = fun(*args, **kwargs)
-            ret = _copy(cache[key])
+            MEMO_STATS.add(fun.__qualname__, 'misses')
+            if shared and SHARED_MEMO:
+                value = _call_shared(fun, args, kwargs)
+            else:
+                value = fun(*args, **kwargs)
+            memo_cache.put(key, value)
+            ret = _copy(value)
             return ret
         except TypeError:
             print('memoization type error in function {} for arguments {}'
                   .format(fun.__name__, key))
             raise
 
-    cache = {}
+    def _instance_cache(obj):
+        memo = vars(obj).setdefault('_memo', {})
+        memo_cache = memo.get(fun.__qualname__)
+        if memo_cache is None:
+            memo_cache = memo.setdefault(
+                fun.__qualname__,
+                MemoCache(fun.__qualname__, max_entries, max_bytes))
+            instance_caches.add(memo_cache)
+        return memo_cache
+
+    def cache_clear():
+        cache.clear()
+        for memo_cache in list(instance_caches):
+            memo_cache.clear()
+
+    cache = MemoCache(fun.__qualname__, max_entries, max_bytes)
+    # the caches of this method on each live instance of a CACHED class
+    instance_caches = weakref.WeakSet()
+    wrapper.cache = cache
+    wrapper.cache_clear = cache_clear
     return wrapper
+
+
+def release(obj):
+    """Frees the parsed HTML documents memoized by the methods of a CACHED
+    instance, keeping the other results (e.g. tables extracted from the
+    documents). Documents needed again are parsed again from the HTML cache.
+    """
+    for memo_cache in vars(obj).get('_memo', {}).values():
+        memo_cache.discard(lambda value: isinstance(value, pq))
@@ -1,12 +1,16 @@
+import getpass
 import json
 import os
 import time
 import collections
 from urllib.parse import urlencode
+import appdirs
 import pandas as pd
 from pyquery import PyQuery as pq
 
 from nfl_stats import PFR_BASE
+from .. import cache
+from .. import decorators
 from .. import utils
 from .. import pbp
 
@@ -88,107 +92,118 @@ class FinderObj():
             print('Options: {}'.format(', '.join([str(o) for o in vals['options']])))
 
 
+    def _read_options(self):
+        # the options saved in the constants file, or None if the file is
+        # missing or more than a week old
+        try:
+            modtime = os.path.getmtime(self.opt_file)
+        except OSError:
+            return None
+        if time.time() - modtime > 7 * 24 * 60 * 60:
+            return None
+        with open(self.opt_file, 'r') as const_f:
+            return json.load(const_f)
+
     def _inputs_options_defaults(self):
         """Handles scraping options for play finder form.
 
         :returns: {'name1': {'value': val, 'options': [opt1, ...] }, ... }
 
         """
-        # set time variables
-        if os.path.isfile(self.opt_file):
-            modtime = int(os.path.getmtime(self.opt_file))
-            curtime = int(time.time())
-        # if file found and it's been <= a week
-        if (os.path.isfile(self.opt_file)
-                and curtime - modtime <= 7 * 24 * 60 * 60):
-
-            # just read the dict from the cached file
-            with open(self.opt_file, 'r') as const_f:
-                def_dict = json.load(const_f)
-
-        # otherwise, we must regenerate the dict and rewrite it
-        else:
-            print('Regenerating {} Constants file'.format(str(self)))
-
-            html = utils.get_html(self.url)
-            doc = pq(html)
+        # just read the dict from the cached file if it's been <= a week
+        def_dict = self._read_options()
+        if def_dict is not None:
+            return def_dict
+        # otherwise, we must regenerate the dict and rewrite it; processes
+        # take turns, so that only the first one scrapes the form
+        with decorators.FillLock(self.opt_file):
+            def_dict = self._read_options()
+            if def_dict is None:
+                def_dict = self._scrape_options()
+        return def_dict
 
-            def_dict = {}
-            # start with input elements
-            for inp in doc('form#{} input[name]'.format(self.form_id)):
-                name = inp.attrib['name']
-                # add blank dict if not present
-                if name not in def_dict:
-                    def_dict[name] = {
-                        'value': set(),
-                        'options': set(),
-                        'type': inp.attrib['type']
-                    }
-
-                val = inp.attrib.get('value', '')
-                # handle checkboxes and radio buttons
-                if inp.type in ('checkbox', 'radio'):
-                    # deal with default value
-                    if 'checked' in inp.attrib:
-                        def_dict[name]['value'].add(val)
-                    # add to options
-                    def_dict[name]['options'].add(val)
-                # handle other types of inputs (only other type is hidden?)
-                else:
-                    def_dict[name]['value'].add(val)
+    def _scrape_options(self):
+        print('Regenerating {} Constants file'.format(str(self)))
 
-            # for dropdowns (select elements)
-            for sel in doc.items('form#{} select[name]'.format(self.form_id)):
-                name = sel.attr['name']
-                # add blank dict if not present
-                if name not in def_dict:
-                    def_dict[name] = {
-                        'value': set(),
-                        'options': set(),
-                        'type': 'select'
-                    }
+        html = utils.get_html(self.url)
+        doc = pq(html)
 
+        def_dict = {}
+        # start with input elements
+        for inp in doc('form#{} input[name]'.format(self.form_id)):
+            name = inp.attrib['name']
+            # add blank dict if not present
+            if name not in def_dict:
+                def_dict[name] = {
+                    'value': set(),
+                    'options': set(),
+                    'type': inp.attrib['type']
+                }
+
+            val = inp.attrib.get('value', '')
+            # handle checkboxes and radio buttons
+            if inp.type in ('checkbox', 'radio'):
                 # deal with default value
-                default_opt = sel('option[selected]')
-                if len(default_opt):
-                    default_opt = default_opt[0]
-                    def_dict[name]['value'].add(default_opt.attrib.get('value', ''))
-                else:
-                    def_dict[name]['value'].add(
-                        sel('option')[0].attrib.get('value', '')
-                    )
-
-                # deal with options
-                def_dict[name]['options'] = {
-                    opt.attrib['value'] for opt in sel('option')
-                    if opt.attrib.get('value')
+                if 'checked' in inp.attrib:
+                    def_dict[name]['value'].add(val)
+                # add to options
+                def_dict[name]['options'].add(val)
+            # handle other types of inputs (only other type is hidden?)
+            else:
+                def_dict[name]['value'].add(val)
+
+        # for dropdowns (select elements)
+        for sel in doc.items('form#{} select[name]'.format(self.form_id)):
+            name = sel.attr['name']
+            # add blank dict if not present
+            if name not in def_dict:
+                def_dict[name] = {
+                    'value': set(),
+                    'options': set(),
+                    'type': 'select'
                 }
 
-            for k, v in self.extra_defs.items():
-                if k not in def_dict:
-                    def_dict[k] = {
-                        'value': set(),
-                        'options': set(),
-                        'type': type(v).__name__
-                    }
-                def_dict[k]['value'] = [v]
-
-            def_dict.pop('request', None)
-            def_dict.pop('use_favorites', None)
-
-            with open(self.opt_file, 'w+') as f:
-                for k in def_dict:
-                    try:
-                        def_dict[k]['value'] = sorted(
-                            list(def_dict[k]['value']), key=int
-                        )
-                        def_dict[k]['options'] = sorted(
-                            list(def_dict[k]['options']), key=int
-                        )
-                    except ValueError:
-                        def_dict[k]['value'] = sorted(list(def_dict[k]['value']))
-                        def_dict[k]['options'] = sorted(list(def_dict[k]['options']))
-                json.dump(def_dict, f)
+            # deal with default value
+            default_opt = sel('option[selected]')
+            if len(default_opt):
+                default_opt = default_opt[0]
+                def_dict[name]['value'].add(default_opt.attrib.get('value', ''))
+            else:
+                def_dict[name]['value'].add(
+                    sel('option')[0].attrib.get('value', '')
+                )
+
+            # deal with options
+            def_dict[name]['options'] = {
+                opt.attrib['value'] for opt in sel('option')
+                if opt.attrib.get('value')
+            }
+
+        for k, v in self.extra_defs.items():
+            if k not in def_dict:
+                def_dict[k] = {
+                    'value': set(),
+                    'options': set(),
+                    'type': type(v).__name__
+                }
+            def_dict[k]['value'] = [v]
+
+        def_dict.pop('request', None)
+        def_dict.pop('use_favorites', None)
+
+        for k in def_dict:
+            try:
+                def_dict[k]['value'] = sorted(
+                    list(def_dict[k]['value']), key=int
+                )
+                def_dict[k]['options'] = sorted(
+                    list(def_dict[k]['options']), key=int
+                )
+            except ValueError:
+                def_dict[k]['value'] = sorted(list(def_dict[k]['value']))
+                def_dict[k]['options'] = sorted(list(def_dict[k]['options']))
+        # written atomically, as other processes may be reading the file
+        cache.atomic_write(self.opt_file, json.dumps(def_dict).encode('utf-8'))
 
         return def_dict
 
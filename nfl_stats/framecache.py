@@ -0,0 +1,224 @@
+"""A second cache tier holding parsed DataFrames, so that reprocessing pages
+that are already in the HTML cache skips HTML parsing entirely.
+
+A frame is keyed by a hash of the pages it was parsed from, the function that
+parsed it and its arguments, and `utils.PARSER_VERSION`. A changed page or a
+change to the parser therefore never serves an outdated frame. Frames of the
+same function and arguments share a directory, so writing the new frame
+removes the one it replaces; `prune` removes frames that have been idle long
+enough.
+
+Frames are stored as Parquet when pyarrow is installed and the frame survives
+the round trip unchanged (same values, dtypes and index), and are pickled
+otherwise.
+"""
+import hashlib
+import io
+import os
+import pickle
+import shutil
+import time
+
+import pandas as pd
+from boltons import funcutils
+
+from . import cache
+from . import utils
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+__all__ = ['cached_frame', 'read_frame', 'write_frame', 'clear', 'prune']
+
+# set to False to always parse pages, e.g. while working on the parser
+ENABLED = True
+# the codec used for the column chunks of Parquet frames
+PARQUET_COMPRESSION = 'zstd'
+
+_PARQUET_EXT = '.parquet'
+_PICKLE_EXT = '.pkl'
+
+
+def frame_dir():
+    """Returns the directory holding cached frames, creating it if needed."""
+    path = os.path.join(cache.cache_dir(), 'frames')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def frame_key(urls, name, args=(), kwargs=None):
+    """Computes the key of a parsed frame.
+
+    :urls: the URLs of the pages the frame is parsed from.
+    :name: the qualified name of the function that parses the frame.
+    :args: the positional arguments of the function.
+    :kwargs: the keyword arguments of the function.
+    :returns: the key, as two hex strings joined by a '/': the hash of the
+        function and its arguments, and the hash of everything else.
+    """
+    call = (name, args, sorted((kwargs or {}).items()))
+    content = hashlib.md5()
+    for url in urls:
+        content.update(utils.get_html(url).encode('utf-8', 'surrogatepass'))
+    key = (content.hexdigest(), call, utils.PARSER_VERSION, pd.__version__)
+    return '{}/{}'.format(hashlib.md5(repr(call).encode('utf-8')).hexdigest(),
+                          hashlib.md5(repr(key).encode('utf-8')).hexdigest())
+
+
+def read_frame(key):
+    """Reads a frame from the cache.
+    :returns: the DataFrame, or None if it is not cached.
+    """
+    base = os.path.join(frame_dir(), key)
+    for ext in (_PARQUET_EXT, _PICKLE_EXT):
+        filename = base + ext
+        try:
+            with open(filename, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            continue
+        try:
+            if ext == _PARQUET_EXT:
+                df = pyarrow.parquet.read_table(
+                    pyarrow.BufferReader(data)).to_pandas()
+            else:
+                df = pickle.loads(data)
+        except Exception as e:
+            print('Warning: ignoring unreadable cached frame {}: {}'
+                  .format(filename, e))
+            continue
+        _touch(filename)
+        return df
+    return None
+
+
+def write_frame(key, df):
+    """Writes a frame to the cache, as Parquet if it can be restored exactly
+    and pickled otherwise. For keys made by `frame_key`, the frames it
+    replaces (those of the same function and arguments) are removed.
+    """
+    base = os.path.join(frame_dir(), key)
+    os.makedirs(os.path.dirname(base), exist_ok=True)
+    data = _to_parquet(df)
+    if data is not None:
+        filename = base + _PARQUET_EXT
+        cache.atomic_write(filename, data)
+    else:
+        filename = base + _PICKLE_EXT
+        cache.atomic_write(filename,
+                           pickle.dumps(df, pickle.HIGHEST_PROTOCOL))
+    if '/' in key:
+        _remove_replaced(filename)
+
+
+def _remove_replaced(filename):
+    # removes the other frames in the directory of a frame just written,
+    # which were parsed from older pages or by an older parser
+    path, name = os.path.split(filename)
+    with os.scandir(path) as it:
+        for dir_entry in it:
+            if dir_entry.name != name and \
+                    not dir_entry.name.startswith('.tmp-'):
+                try:
+                    os.remove(dir_entry.path)
+                except OSError:
+                    pass
+
+
+def _to_parquet(df):
+    # returns the frame serialized as Parquet, or None if pyarrow is missing
+    # or the frame would come back different, e.g. an object column holding
+    # both ints and floats would be restored as float64
+    if pyarrow is None:
+        return None
+    try:
+        table = pyarrow.Table.from_pandas(df)
+        restored = table.to_pandas()
+    except (pyarrow.ArrowException, TypeError, ValueError):
+        return None
+    if not (restored.equals(df) and restored.index.equals(df.index) and
+            restored.columns.equals(df.columns) and
+            restored.dtypes.equals(df.dtypes) and
+            restored.index.dtype == df.index.dtype):
+        return None
+    buf = io.BytesIO()
+    pyarrow.parquet.write_table(table, buf, compression=PARQUET_COMPRESSION)
+    return buf.getvalue()
+
+
+def _touch(filename):
+    # records the access time of a frame for `prune`, at most once every
+    # cache.ACCESS_RESOLUTION seconds
+    now = time.time()
+    try:
+        st = os.stat(filename)
+        if now - st.st_atime > cache.ACCESS_RESOLUTION:
+            os.utime(filename, (now, st.st_mtime))
+    except OSError:
+        pass
+
+
+def cached_frame(urls):
+    """Decorator that caches the DataFrame returned by a parsing function
+    across runs.
+
+    :urls: a function taking the same arguments as the decorated function,
+        returning the URL (or list of URLs) of the pages the frame is parsed
+        from.
+    """
+    def decorator(func):
+        name = '{}.{}'.format(func.__module__, func.__qualname__)
+
+        @funcutils.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            sources = urls(*args, **kwargs)
+            if isinstance(sources, str):
+                sources = [sources]
+            key = frame_key(sources, name, args, kwargs)
+            df = read_frame(key)
+            if df is not None:
+                return df
+            df = func(*args, **kwargs)
+            if isinstance(df, pd.DataFrame):
+                write_frame(key, df)
+            return df
+
+        return wrapper
+    return decorator
+
+
+def clear():
+    """Removes all cached frames."""
+    shutil.rmtree(frame_dir(), ignore_errors=True)
+
+
+def prune(max_idle_days):
+    """Removes the frames that have not been read for `max_idle_days` days,
+    including frames orphaned by changed pages or a new parser version.
+    :returns: the number of bytes freed.
+    """
+    cutoff = time.time() - max_idle_days * 86400
+    freed = 0
+    top = frame_dir()
+    for path, _, filenames in os.walk(top, topdown=False):
+        for fn in filenames:
+            filename = os.path.join(path, fn)
+            try:
+                st = os.stat(filename)
+                if max(st.st_atime, st.st_mtime) < cutoff:
+                    os.remove(filename)
+                    freed += st.st_size
+            except OSError:
+                pass
+        if path != top:
+            # remove the directories left empty
+            try:
+                os.rmdir(path)
+            except OSError:
+                pass
+    return freed
@@ -1,3 +1,4 @@
+import asyncio
 import re
 import datetime
 from urllib.parse import urljoin
@@ -5,8 +6,10 @@ import pandas as pd
 from pyquery import PyQuery as pq
 
 from nfl_stats import PFR_BASE
+from . import aio
 from . import utils
 from . import decorators
+from . import framecache
 from . import pbp
 
 __all__ = [
@@ -42,6 +45,12 @@ class Player(metaclass=decorators.CACHED):
     def __reduce__(self):
         return Player, (self.id_str,)
 
+    def release(self):
+        """Frees the parsed pages of this player, keeping the results already
+        extracted from them.
+        """
+        decorators.release(self)
+
     def _sub_url(self, page, year=None):
         # if no year, return career version
         if year is None:
@@ -55,6 +64,13 @@ class Player(metaclass=decorators.CACHED):
         doc = pq(utils.get_html(self.base_url))
         return doc
 
+    async def aget_doc(self):
+        """Async counterpart of get_doc; the page is fetched without blocking
+        the event loop.
+        """
+        await aio.get_html(self.base_url)
+        return self.get_doc()
+
     @property
     @decorators.memoize
     def name(self):
@@ -192,6 +208,8 @@ class Player(metaclass=decorators.CACHED):
         return None
 
     @decorators.memoize
+    @framecache.cached_frame(lambda self, year=None: [
+        self.base_url, self._sub_url('gamelog', year)])
     def get_gamelogs(self, year=None):
         '''Gets the career gamelogs for player.
         :years: An int year to get data for.
@@ -209,6 +227,16 @@ class Player(metaclass=decorators.CACHED):
         all_g['name'] = self.name
         return all_g
 
+    async def aget_gamelogs(self, year=None):
+        '''Async counterpart of get_gamelogs; the player's page and gamelog
+        page are fetched without blocking the event loop.
+        '''
+        await asyncio.gather(
+            aio.get_html(self.base_url),
+            aio.get_html(self._sub_url('gamelog', year)),
+        )
+        return self.get_gamelogs(year)
+
     @decorators.memoize
     def get_fantasy_stats(self, year=None):
         '''Gets the career fantasy stats for player.
@@ -0,0 +1,122 @@
+"""The types of the columns of tables parsed by `utils.parse_table`.
+
+Columns are registered by their PFR `data-stat` name, or by the name
+parse_table renames them to (e.g. 'position' for 'pos', 'team_id' for 'team').
+A registered column is built with its type instead of one guessed from its
+values:
+
+* INT: integers, e.g. yards and touchdowns. A column with missing values
+  stays float, with NaN for the missing values.
+* FLOAT: floats, e.g. ratings and averages.
+* PERCENT: floats with the values PFR prints, e.g. 64.5; cells written as
+  '64.5%' become fractions, as in unregistered columns.
+* ID: text that is left as it is, never converted to a number.
+* CATEGORY: a pd.Categorical, e.g. positions and team IDs.
+
+Empty cells become missing values. If a numeric column holds values that are
+not numbers, or an INT column holds fractions, it is left as parse_table
+would build an unregistered column, rather than losing those values.
+
+Register more columns with `register`.
+"""
+
+__all__ = [
+    'INT', 'FLOAT', 'PERCENT', 'ID', 'CATEGORY', 'register', 'kind_of',
+    'categories_of',
+]
+
+INT = 'int'
+FLOAT = 'float'
+PERCENT = 'percent'
+ID = 'id'
+CATEGORY = 'category'
+
+_KINDS = (INT, FLOAT, PERCENT, ID, CATEGORY)
+
+# column name -> kind
+COLUMNS = {}
+# column name -> the fixed categories of a CATEGORY column; other CATEGORY
+# columns take their categories from the values in the table
+CATEGORIES = {}
+
+
+def register(kind, *names, categories=None):
+    """Registers the type of one or more columns.
+    :kind: one of INT, FLOAT, PERCENT, ID and CATEGORY.
+    :names: the `data-stat` names of the columns, or the names parse_table
+        renames them to.
+    :categories: for CATEGORY columns, a list of the possible values; values
+        that are not in it become missing. Defaults to the values found.
+    """
+    if kind not in _KINDS:
+        raise ValueError('unknown column kind {!r}, expected one of {}'
+                         .format(kind, ', '.join(_KINDS)))
+    for name in names:
+        COLUMNS[name] = kind
+        if categories is not None:
+            CATEGORIES[name] = list(categories)
+        else:
+            CATEGORIES.pop(name, None)
+
+
+def kind_of(name):
+    """Returns the kind registered for a column, or None."""
+    return COLUMNS.get(name)
+
+
+def categories_of(name):
+    """Returns the fixed categories of a CATEGORY column, or None if they
+    are taken from the values in the table.
+    """
+    return CATEGORIES.get(name)
+
+
+register(ID, 'player_id', 'boxscore_id', 'game_id', 'coach_id',
+         'college_id', 'stadium_id')
+
+register(CATEGORY, 'position', 'team_id', 'opp', 'game_day_of_week')
+register(CATEGORY, 'game_location', categories=['H', 'A', 'N'])
+register(CATEGORY, 'game_outcome', 'game_result', categories=['W', 'L', 'T'])
+
+register(
+    INT,
+    # games, seasons and draft
+    'year', 'season', 'year_min', 'year_max', 'game_num', 'g',
+    'uniform_number', 'weight', 'draft_round', 'draft_pick', 'draft_yr',
+    'av',
+    # scores and plays
+    'team_score', 'opp_score', 'pts_off', 'pts_def', 'points',
+    'points_opp', 'total_yards', 'turnovers', 'wins', 'losses', 'ties',
+    'down', 'yds_to_go', 'pbp_score_aw', 'pbp_score_hm', 'penalties',
+    'penalties_yds',
+    # passing
+    'pass_cmp', 'pass_att', 'pass_yds', 'pass_td', 'pass_int',
+    'pass_sacked', 'pass_sacked_yds', 'pass_long',
+    # rushing and receiving
+    'rush_att', 'rush_yds', 'rush_td', 'rush_long', 'targets', 'rec',
+    'rec_yds', 'rec_td', 'rec_long', 'fumbles', 'fumbles_lost',
+    # defense
+    'tackles_solo', 'tackles_assists', 'def_int', 'def_int_yds',
+    'def_int_td', 'fumbles_forced', 'fumbles_rec', 'fumbles_rec_yds',
+    'fumbles_rec_td',
+    # returns and kicking
+    'kick_ret', 'kick_ret_yds', 'kick_ret_td', 'punt_ret', 'punt_ret_yds',
+    'punt_ret_td', 'xpm', 'xpa', 'fgm', 'fga', 'punt', 'punt_yds',
+    # snap counts
+    'offense', 'defense', 'special_teams',
+)
+
+register(
+    FLOAT,
+    'age', 'mp', 'sacks', 'pass_rating', 'pass_yds_per_att',
+    'pass_adj_yds_per_att', 'pass_yds_per_cmp', 'pass_yds_per_g',
+    'rush_yds_per_att', 'rush_yds_per_g', 'rec_yds_per_rec',
+    'rec_yds_per_tgt', 'rec_yds_per_g', 'exp_pts_before', 'exp_pts_after',
+    'fantasy_points',
+)
+
+register(
+    PERCENT,
+    'pass_cmp_perc', 'pass_td_perc', 'pass_int_perc', 'pass_sacked_perc',
+    'catch_pct', 'fg_perc', 'xp_perc', 'off_pct', 'def_pct', 'st_pct',
+)
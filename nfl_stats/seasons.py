@@ -2,9 +2,11 @@ import numpy as np
 from pyquery import PyQuery as pq
 
 from nfl_stats import PFR_BASE
+from . import aio
 from . import teams
 from . import utils
 from . import decorators
+from . import framecache
 
 __all__ = ['Season']
 
@@ -29,6 +31,15 @@ class Season(metaclass=decorators.CACHED):
     def __repr__(self):
         return 'Season({})'.format(self.year)
 
+    def release(self):
+        """Frees the parsed pages of this season, keeping the results already
+        extracted from them.
+        """
+        decorators.release(self)
+
+    def _main_url(self):
+        return PFR_BASE + '/years/{}/'.format(self.year)
+
     def _subpage_url(self, page):
         return (PFR_BASE +
                 '/years/{}/{}.htm'.format(self.year, page))
@@ -38,8 +49,12 @@ class Season(metaclass=decorators.CACHED):
         """Returns PyQuery object for the main season URL.
         :returns: PyQuery object.
         """
-        url = PFR_BASE + '/years/{}/'.format(self.year)
-        return pq(utils.get_html(url))
+        return pq(utils.get_html(self._main_url()))
+
+    async def aget_main_doc(self):
+        """Async counterpart of get_main_doc."""
+        await aio.get_html(self._main_url())
+        return self.get_main_doc()
 
     @decorators.memoize
     def get_sub_doc(self, subpage):
@@ -50,6 +65,11 @@ class Season(metaclass=decorators.CACHED):
         html = utils.get_html(self._subpage_url(subpage))
         return pq(html)
 
+    async def aget_sub_doc(self, subpage):
+        """Async counterpart of get_sub_doc."""
+        await aio.get_html(self._subpage_url(subpage))
+        return self.get_sub_doc(subpage)
+
     @decorators.memoize
     def get_team_ids(self):
         """Returns a list of the team IDs for the given year.
@@ -91,6 +111,8 @@ class Season(metaclass=decorators.CACHED):
         return df
 
     @decorators.memoize
+    @framecache.cached_frame(
+        lambda self, subpage, table_id: self._subpage_url(subpage))
     def _get_player_stats_table(self, subpage, table_id):
         """Helper function for player season stats.
 
@@ -114,7 +136,7 @@ class Season(metaclass=decorators.CACHED):
         """Returns a DataFrame of receiving player stats for a season."""
         return self._get_player_stats_table('receiving', 'receiving')
 
-    @decorators.memoize
+    @decorators.memoize(shared=True)
     def _get_week_links(self):
         """Fetches links to boxscores for all weeks in season"""
         doc = self.get_main_doc()
@@ -127,7 +149,7 @@ class Season(metaclass=decorators.CACHED):
     def get_box_scores(self):
         pass
 
-    @decorators.memoize
+    @decorators.memoize(shared=True)
     def get_year_info(self):
         doc = self.get_main_doc()
         meta = doc('div#meta')
@@ -4,7 +4,9 @@ import pandas as pd
 from pyquery import PyQuery as pq
 
 from nfl_stats import PFR_BASE
+from . import aio
 from . import decorators
+from . import framecache
 from . import utils
 from . import boxscores
 
@@ -22,7 +24,7 @@ PLAYOFF_WEEK_NUMS = {
     "SuperBowl" : 21,
 }
 
-@decorators.memoize
+@decorators.memoize(shared=True)
 def team_names(year):
     """Returns a mapping from team ID to full team name for a given season.
     Example of a full team name: "New England Patriots"
@@ -92,22 +94,39 @@ class Team(metaclass=decorators.CACHED):
     def __reduce__(self):
         return Team, (self.team_id,)
 
+    def release(self):
+        """Frees the parsed pages of this team, keeping the results already
+        extracted from them.
+        """
+        decorators.release(self)
+
     @decorators.memoize
     def team_year_url(self, yr_str):
         return (PFR_BASE +
                 '/teams/{}/{}.htm'.format(self.team_id, yr_str))
 
+    def _main_url(self):
+        return PFR_BASE + '/teams/{}'.format(self.team_id)
+
     @decorators.memoize
     def get_main_doc(self):
-        rel_url = '/teams/{}'.format(self.team_id)
-        team_url = PFR_BASE + rel_url
-        doc = pq(utils.get_html(team_url))
+        doc = pq(utils.get_html(self._main_url()))
         return doc
 
+    async def aget_main_doc(self):
+        """Async counterpart of get_main_doc."""
+        await aio.get_html(self._main_url())
+        return self.get_main_doc()
+
     @decorators.memoize
     def get_year_doc(self, yr_str):
         return pq(utils.get_html(self.team_year_url(yr_str)))
 
+    async def aget_year_doc(self, yr_str):
+        """Async counterpart of get_year_doc."""
+        await aio.get_html(self.team_year_url(yr_str))
+        return self.get_year_doc(yr_str)
+
     @property
     @decorators.memoize
     def name(self):
@@ -126,6 +145,8 @@ class Team(metaclass=decorators.CACHED):
         return ' '.join(teamwords)
 
     @decorators.memoize
+    @framecache.cached_frame(
+        lambda self, year: self.team_year_url('{}_roster'.format(year)))
     def roster(self, year):
         """Returns the roster table for the given year.
 
@@ -240,7 +261,8 @@ class Team(metaclass=decorators.CACHED):
             return np.nan
         return schedule.query('week_num <= 17').is_win.sum()
 
-    @decorators.memoize
+    @decorators.memoize(shared=True)
+    @framecache.cached_frame(lambda self, year: self.team_year_url(year))
     def schedule(self, year):
         """Returns a DataFrame with schedule information for the given year.
 
@@ -0,0 +1,249 @@
+import ctypes
+import email.utils
+import math
+import multiprocessing as mp
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """A token-bucket rate limiter shared between processes.
+
+    The bucket state lives in shared memory, so every process forked after the
+    bucket is created draws from the same budget. Taking a token only reserves
+    a send slot: the lock is released before the caller waits for its slot or
+    makes its request, so slow responses do not hold up other workers.
+    """
+
+    # indices into the shared state array
+    _TOKENS, _UPDATED, _RATE, _BURST = range(4)
+
+    def __init__(self, rate, burst=1):
+        """
+        :rate: the sustained number of requests allowed per second.
+        :burst: the number of requests that may be sent back-to-back after
+            an idle period.
+        """
+        self._lock = mp.Lock()
+        self._state = mp.RawArray(ctypes.c_double, 4)
+        self._state[self._TOKENS] = burst
+        self._state[self._UPDATED] = time.time()
+        self._state[self._RATE] = rate
+        self._state[self._BURST] = burst
+
+    def __repr__(self):
+        return 'TokenBucket(rate={}, burst={})'.format(self.rate, self.burst)
+
+    @property
+    def rate(self):
+        return self._state[self._RATE]
+
+    @property
+    def burst(self):
+        return self._state[self._BURST]
+
+    def configure(self, rate=None, burst=None):
+        """Changes the rate and/or burst size of the bucket for all processes
+        sharing it.
+        """
+        with self._lock:
+            self._refill(time.time())
+            if rate is not None:
+                self._state[self._RATE] = rate
+            if burst is not None:
+                self._state[self._BURST] = burst
+                self._state[self._TOKENS] = min(self._state[self._TOKENS],
+                                                burst)
+
+    def _refill(self, now):
+        state = self._state
+        elapsed = max(0., now - state[self._UPDATED])
+        state[self._TOKENS] = min(
+            state[self._BURST],
+            state[self._TOKENS] + elapsed * state[self._RATE]
+        )
+        state[self._UPDATED] = now
+
+    def reserve(self):
+        """Takes a token from the bucket. The token count may go negative, in
+        which case the slot is reserved in the future.
+        :returns: the number of seconds to wait before using the slot.
+        """
+        with self._lock:
+            self._refill(time.time())
+            self._state[self._TOKENS] -= 1
+            tokens = self._state[self._TOKENS]
+            rate = self._state[self._RATE]
+        return max(0., -tokens / rate)
+
+    def wait(self):
+        """Reserves a slot and sleeps until it is due."""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def penalize(self, delay):
+        """Holds back every user of the bucket, e.g. after the server has
+        asked us to slow down, so that no new slot is due for `delay` seconds.
+        """
+        with self._lock:
+            self._refill(time.time())
+            self._state[self._TOKENS] = min(
+                self._state[self._TOKENS],
+                1 - delay * self._state[self._RATE]
+            )
+
+
+class HostLimiter:
+    """A set of token buckets, one per host, so that independent sites are
+    each throttled at their own rate instead of sharing a single budget.
+
+    Buckets are shared with forked workers only if they exist before the
+    fork, so hosts should be registered (through `limits` or `set_limit`)
+    before starting a pool. Hosts that were not registered get a bucket with
+    the default rate the first time they are requested.
+    """
+
+    def __init__(self, limits=None, default_rate=1., default_burst=1):
+        """
+        :limits: a dict mapping host names to (rate, burst) tuples.
+        :default_rate: the rate for hosts not in `limits`.
+        :default_burst: the burst size for hosts not in `limits`.
+        """
+        self.default_rate = default_rate
+        self.default_burst = default_burst
+        self._buckets = {}
+        # hosts whose buckets were given the default rate
+        self._defaulted = set()
+        self._lock = threading.Lock()
+        for host, (rate, burst) in (limits or {}).items():
+            self.set_limit(host, rate, burst)
+
+    def __repr__(self):
+        return 'HostLimiter({})'.format(self._buckets)
+
+    def set_limit(self, host, rate, burst=1):
+        """Sets the rate and burst size for a host, creating its bucket if
+        needed.
+        """
+        host = host.lower()
+        with self._lock:
+            self._defaulted.discard(host)
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                self._buckets[host] = TokenBucket(rate, burst)
+                return
+        bucket.configure(rate=rate, burst=burst)
+
+    def get_bucket(self, url):
+        """Returns the bucket used to throttle requests to the host of `url`.
+        :url: an absolute URL or a bare host name.
+        """
+        host = (urlparse(url).netloc or url).lower()
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.default_rate, self.default_burst)
+                self._buckets[host] = bucket
+                self._defaulted.add(host)
+        return bucket
+
+    def set_default(self, rate, burst=1):
+        """Sets the rate and burst size for hosts without a limit of their
+        own, including those that already have a bucket.
+        """
+        with self._lock:
+            self.default_rate = rate
+            self.default_burst = burst
+            buckets = [self._buckets[host] for host in self._defaulted]
+        for bucket in buckets:
+            bucket.configure(rate=rate, burst=burst)
+
+    def reserve(self, url):
+        """Reserves a send slot for the host of `url`.
+        :returns: the number of seconds to wait before using the slot.
+        """
+        return self.get_bucket(url).reserve()
+
+    def wait(self, url):
+        """Reserves a slot for the host of `url` and sleeps until it is due."""
+        self.get_bucket(url).wait()
+
+    def penalize(self, url, delay):
+        """Holds back all requests to the host of `url` for `delay` seconds."""
+        self.get_bucket(url).penalize(delay)
+
+
+class RetryPolicy:
+    """Decides whether a failed request should be retried, and how long to
+    wait before retrying it: exponential backoff with random jitter, but never
+    less than the server asked for in a Retry-After header. A request whose
+    Retry-After is longer than `max_delay` is not retried.
+    """
+
+    def __init__(self, max_attempts=5, base_delay=1., max_delay=120.,
+                 jitter=.5, statuses=(429, 500, 502, 503, 504)):
+        """
+        :max_attempts: the total number of attempts made for a request.
+        :base_delay: the delay after the first failure, in seconds; it
+            doubles after each further failure.
+        :max_delay: the longest delay between attempts, in seconds. Requests
+            the server asks to retry later than this are given up.
+        :jitter: the fraction by which each delay is randomly varied, so that
+            workers that failed together do not retry together.
+        :statuses: the HTTP status codes worth retrying.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.statuses = statuses
+
+    def __repr__(self):
+        return 'RetryPolicy(max_attempts={}, base_delay={}, max_delay={})'.format(
+            self.max_attempts, self.base_delay, self.max_delay)
+
+    def retry_delay(self, attempt, status_code=None, retry_after=None):
+        """
+        :attempt: the number of attempts made so far.
+        :status_code: the status code of the failed response, or None if no
+            response was received.
+        :retry_after: the value of the response's Retry-After header, if any.
+        :returns: the number of seconds to wait before the next attempt, or
+            None if the request should not be retried.
+        """
+        if attempt >= self.max_attempts:
+            return None
+        if status_code is not None and status_code not in self.statuses:
+            return None
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        requested = parse_retry_after(retry_after)
+        if requested is not None:
+            if requested > self.max_delay:
+                return None
+            delay = max(delay, requested)
+        return delay
+
+
+def parse_retry_after(value):
+    """Parses the value of a Retry-After header, which is either a number of
+    seconds or an HTTP date.
+    :returns: the number of seconds to wait, or None if it can't be parsed
+        (including values such as 'inf' and 'nan').
+    """
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        pass
+    else:
+        return max(0., seconds) if math.isfinite(seconds) else None
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0., when.timestamp() - time.time())
@@ -0,0 +1,272 @@
+"""Policies deciding how long a cached page stays fresh.
+
+The default `AdaptivePolicy` records a hash of the content of every page
+fetched into the cache and learns, for each class of URL, how often pages of
+that class actually change. Classes that never change are then refetched
+rarely and live ones often, so the request budget goes to pages that move.
+The fixed rules of `StaticPolicy` serve as the starting point, which the
+observations of a class gradually override.
+
+Policies are pluggable: subclass `TTLPolicy` and install it with
+`set_policy`.
+"""
+import datetime
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+from . import cache
+
+__all__ = [
+    'TTLPolicy', 'StaticPolicy', 'AdaptivePolicy', 'url_class',
+    'content_digest', 'get_policy', 'set_policy',
+]
+
+# first path segments whose second segment is an ID (a team or the letter
+# indexing a player), for grouping URLs into classes
+_ID_PARENTS = ('players', 'teams', 'coaches', 'officials', 'executives')
+
+# parts of a page that change on every request without the page changing
+_VOLATILE_RE = re.compile(r'<(script|style)\b.*?</\1>', re.I | re.S)
+
+
+def days_valid_pfr(url):
+    """The fixed freshness rules for Pro-Football-Reference pages.
+    :returns: the number of days a cached copy of `url` stays fresh.
+    """
+    # boxscores are static, but refresh quarterly to be sure
+    if 'boxscore' in url:
+        return 90
+    phase = _season_phase(url)
+    # pages about an earlier season rarely change
+    if phase == 'past':
+        return 90
+    # if it's the offseason, refresh cache twice a month
+    if phase == 'offseason':
+        return 15
+    # otherwise, refresh every 2 days
+    return 2
+
+
+def _season_phase(url):
+    # 'past' for pages about an earlier season (going by the first year in
+    # the URL), and otherwise whether the current season is under way
+    today = datetime.date.today()
+    start_of_season = datetime.date(today.year, 8, 15)
+    end_of_season = datetime.date(today.year, 2, 15)
+    m = re.search(r'(\d{4})', url)
+    if m:
+        cur_season = today.year - (today <= end_of_season)
+        if int(m.group(1)) < cur_season:
+            return 'past'
+    if end_of_season < today < start_of_season:
+        return 'offseason'
+    return 'season'
+
+
+def url_class(url):
+    """Groups URLs whose pages change in the same way, e.g.
+    'https://www.pro-football-reference.com/teams/nwe/2019_roster.htm' into
+    'www.pro-football-reference.com/teams/*/*_roster:past'.
+
+    IDs and years in the path are replaced by '*', the query string is
+    dropped, and the phase of the season the page is about is appended.
+    """
+    parsed = urlparse(url)
+    segments = [s for s in parsed.path.split('/') if s]
+    pattern = []
+    for i, seg in enumerate(segments):
+        seg = re.sub(r'\.s?html?$', '', seg)
+        if i == 1 and segments[0] in _ID_PARENTS:
+            seg = '*'
+        elif re.search(r'\d', seg):
+            prefix, _, suffix = seg.rpartition('_')
+            seg = '*_' + suffix if prefix and not re.search(r'\d', suffix) \
+                else '*'
+        pattern.append(seg)
+    return '{}/{}:{}'.format(parsed.netloc.lower(), '/'.join(pattern),
+                             _season_phase(url))
+
+
+def content_digest(text):
+    """Hashes the content of a page, ignoring scripts and styles, which can
+    differ between requests for an unchanged page.
+    """
+    text = _VOLATILE_RE.sub('', text)
+    return hashlib.md5(text.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+class TTLPolicy:
+    """Base class for policies deciding how long cached pages stay fresh."""
+
+    def days_valid(self, url):
+        """Returns the number of days (possibly fractional) that a cached
+        copy of `url` stays fresh after it was fetched.
+        """
+        raise NotImplementedError
+
+    def observe(self, url, text=None):
+        """Called whenever a page has been fetched or revalidated.
+        :url: the URL of the page.
+        :text: the HTML of the page, or None if the server confirmed that
+            the cached copy is unchanged.
+        """
+        pass
+
+
+class StaticPolicy(TTLPolicy):
+    """Fixed freshness rules by site: for PFR pages, 90 days for boxscores
+    and earlier seasons, 15 days in the offseason and 2 days in season.
+    """
+
+    def days_valid(self, url):
+        return days_valid_pfr(url)
+
+
+class AdaptivePolicy(TTLPolicy):
+    """Learns how often each class of URL (see `url_class`) changes from
+    the content hashes of successive fetches, and keeps pages fresh for as
+    long as they are unlikely to have changed.
+
+    Changes are modelled as a Poisson process: the TTL is the age at which
+    the chance that a page has changed reaches `max_stale_prob`. The change
+    rate of a class is estimated from its observed changes and days of
+    observation, plus a prior of one change per period in which the
+    `fallback` TTL would reach that chance. Without observations the
+    fallback TTL is used unchanged, and classes never seen to change get a
+    TTL that grows as evidence accumulates.
+
+    The history is kept in an SQLite database shared by all processes using
+    the cache directory.
+    """
+
+    _SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY,
+            digest TEXT,
+            checked REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS classes (
+            class TEXT PRIMARY KEY,
+            observations INTEGER NOT NULL,
+            changes INTEGER NOT NULL,
+            exposure REAL NOT NULL
+        );
+    '''
+
+    def __init__(self, path=None, fallback=None, max_stale_prob=.1,
+                 min_days=1 / 24., max_days=365., refresh=300.):
+        """
+        :path: the history database. Defaults to `ttl.sqlite` in the user
+            cache directory.
+        :fallback: the policy giving the TTL before any observations.
+            Defaults to StaticPolicy().
+        :max_stale_prob: the accepted chance that a page served from the
+            cache has changed since it was fetched.
+        :min_days: the shortest TTL, in days.
+        :max_days: the longest TTL, in days.
+        :refresh: seconds between reloads of the learned intervals, which
+            other processes may have updated.
+        """
+        self.path = path or os.path.join(cache.cache_dir(), 'ttl.sqlite')
+        self.fallback = fallback or StaticPolicy()
+        self.max_stale_prob = max_stale_prob
+        self.min_days = min_days
+        self.max_days = max_days
+        self.refresh = refresh
+        self._local = threading.local()
+        self._classes = {}
+        self._loaded = 0.
+
+    def __repr__(self):
+        return 'AdaptivePolicy({!r})'.format(self.path)
+
+    @property
+    def conn(self):
+        return cache.local_connection(self._local, self.path, 30.,
+                                      self._SCHEMA)
+
+    def url_class(self, url):
+        """Returns the class whose history is used for `url`."""
+        return url_class(url)
+
+    def class_stats(self):
+        """Returns a dict mapping each observed URL class to a tuple of its
+        number of refetches, number of changes and days of observation.
+        """
+        now = time.time()
+        if now - self._loaded > self.refresh:
+            rows = self.conn.execute(
+                'SELECT class, observations, changes, exposure FROM classes')
+            self._classes = {cls: (n, changes, exposure / 86400)
+                             for cls, n, changes, exposure in rows}
+            self._loaded = now
+        return self._classes
+
+    def days_valid(self, url):
+        prior_days = self.fallback.days_valid(url)
+        n, changes, days = self.class_stats().get(self.url_class(url),
+                                                  (0, 0, 0.))
+        if n == 0:
+            return prior_days
+        hazard = -math.log(1 - self.max_stale_prob)
+        rate = (changes + 1) / (days + prior_days / hazard)
+        return min(self.max_days, max(self.min_days, hazard / rate))
+
+    def observe(self, url, text=None):
+        digest = content_digest(text) if text is not None else None
+        now = time.time()
+        conn = self.conn
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT digest, checked FROM pages'
+                               ' WHERE url = ?', (url,)).fetchone()
+            if row is not None:
+                old_digest, checked = row
+                # a change can only be detected if both fetches were hashed
+                if digest is None or old_digest is not None:
+                    changed = digest is not None and digest != old_digest
+                    conn.execute(
+                        'INSERT OR IGNORE INTO classes'
+                        ' (class, observations, changes, exposure)'
+                        ' VALUES (?, 0, 0, 0)', (self.url_class(url),))
+                    conn.execute(
+                        'UPDATE classes SET observations = observations + 1,'
+                        ' changes = changes + ?, exposure = exposure + ?'
+                        ' WHERE class = ?',
+                        (int(changed), max(0., now - checked),
+                         self.url_class(url)))
+                if digest is None:
+                    digest = old_digest
+            conn.execute('INSERT OR REPLACE INTO pages (url, digest, checked)'
+                         ' VALUES (?, ?, ?)', (url, digest, now))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+
+# the policy used by decorators.cache_html
+_POLICY = None
+
+
+def get_policy():
+    """Returns the policy deciding how long cached pages stay fresh.
+    Defaults to an AdaptivePolicy.
+    """
+    global _POLICY
+    if _POLICY is None:
+        _POLICY = AdaptivePolicy()
+    return _POLICY
+
+
+def set_policy(policy):
+    """Sets the policy deciding how long cached pages stay fresh, e.g.
+    `set_policy(StaticPolicy())` to use only the fixed rules.
+    """
+    global _POLICY
+    _POLICY = policy
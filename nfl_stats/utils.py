@@ -1,49 +1,224 @@
-import ctypes
-import multiprocessing as mp
+import os
 import re
 import string
-import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
 import pandas as pd
 from pandas.api.types import is_string_dtype
 import numpy as np
 from pyquery import PyQuery as pq
+from pyquery.text import extract_text
 
 from . import decorators
+from . import schema
+from . import throttle
 
-# time between requests, in seconds
+# time between requests to a host, in seconds, and the number of requests
+# that may be sent back-to-back after an idle period. They apply to the hosts
+# in HOST_LIMITS and to hosts without a limit of their own, and may be changed
+# at any time; use LIMITER.set_limit to give a host a different rate
 THROTTLE_DELAY = 0.5
+THROTTLE_BURST = 1
+
+# (requests per second, burst) for each host we scrape; each host has its own
+# budget, so crawling one site does not slow down another
+HOST_LIMITS = {
+    'www.pro-football-reference.com': (1 / THROTTLE_DELAY, THROTTLE_BURST),
+    'www.nflpenalties.com': (1 / THROTTLE_DELAY, THROTTLE_BURST),
+    'www.teamrankings.com': (1 / THROTTLE_DELAY, THROTTLE_BURST),
+}
+
+# rate limiters shared by all processes forked from this one
+LIMITER = throttle.HostLimiter(HOST_LIMITS, 1 / THROTTLE_DELAY, THROTTLE_BURST)
+# the THROTTLE_DELAY and THROTTLE_BURST that LIMITER was last set up with
+_THROTTLE_APPLIED = (THROTTLE_DELAY, THROTTLE_BURST)
+
+# how failed requests (rate limiting, server errors, dropped connections) are
+# retried; a retry also holds back all other requests to the same host
+RETRY_POLICY = throttle.RetryPolicy()
+
+# seconds to wait for a server to respond before giving up on the attempt
+REQUEST_TIMEOUT = 30
+
+# connection pooling for the shared HTTP session: the number of hosts to keep
+# pools for, and the number of keep-alive connections kept open per host
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 10
+
+# the version of the table parser, part of the key of parsed frames cached by
+# `framecache`; bump it whenever a change alters what `parse_table` returns
+PARSER_VERSION = 3
+
+# characters used to note things in table cells, like Pro Bowl (*) and
+# All-Pro (+) selections, which parse_table removes
+_NOTES_RE = re.compile(r'[\*\+\u2605]', re.U)
+# game results like 'W 24-17', as split by `_split_game_result`
+_GAME_RESULT_RE = re.compile(r'^\S+ \d+-\d+')
+_PERCENT_RE = re.compile(r'([-\.\d]+)\%', re.U)
+_SALARY_RE = re.compile(r'\$[\d,]+', re.U)
+
+# columns whose raw text parse_table keeps next to the flattened links, for
+# player names, play descriptions, team names and game results
+_RAW_TEXT_COLUMNS = ('game_result', 'player', 'description', 'team',
+                     'team_name')
+
+# one session per process, as pooled sockets must not be shared after a fork
+_SESSION = None
+_SESSION_PID = None
+
+
+def _new_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS,
+                          pool_maxsize=POOL_MAXSIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    # advertise every encoding urllib3 can decode here (brotli is included
+    # when the optional brotli package is installed)
+    session.headers.update({
+        'Accept-Encoding': make_headers(accept_encoding=True)['accept-encoding'],
+        'Connection': 'keep-alive',
+    })
+    return session
+
+
+def get_session():
+    """Returns the HTTP session used for all requests made by this process.
+    The session keeps per-host pools of keep-alive connections, so repeated
+    requests to the same site reuse an open connection.
+    :returns: a requests.Session object.
+    """
+    global _SESSION, _SESSION_PID
+    if _SESSION is None or _SESSION_PID != os.getpid():
+        _SESSION = _new_session()
+        _SESSION_PID = os.getpid()
+    return _SESSION
+
+
+def configure_session(pool_connections=None, pool_maxsize=None):
+    """Changes the connection pool sizes of the shared HTTP session. The
+    current session is closed and a new one is created on the next request.
+    :param pool_connections: the number of hosts to keep connection pools for.
+    :param pool_maxsize: the number of connections to keep open per host.
+    """
+    global POOL_CONNECTIONS, POOL_MAXSIZE, _SESSION
+    if pool_connections is not None:
+        POOL_CONNECTIONS = pool_connections
+    if pool_maxsize is not None:
+        POOL_MAXSIZE = pool_maxsize
+    if _SESSION is not None and _SESSION_PID == os.getpid():
+        _SESSION.close()
+    _SESSION = None
+
+
+class StatusCodeError(ValueError):
+    """Raised when a request receives an error status code."""
+
+    def __init__(self, url, response):
+        super().__init__(
+            'Status Code {} received fetching URL "{}"'
+            .format(response.status_code, url)
+        )
+        self.status_code = response.status_code
+        self.retry_after = response.headers.get('Retry-After')
 
-# variables used to throttle requests across processes
-THROTTLE_LOCK = mp.Lock()
-LAST_REQUEST_TIME = mp.Value(ctypes.c_longdouble,
-                             time.time() - 2 * THROTTLE_DELAY)
 
 @decorators.cache_html
-def get_html(url, allow_redirect=False):
-    """Gets the HTML for the given URL using a GET request.
+def get_html(url, allow_redirect=False, validators=None):
+    """Gets the HTML for the given URL using a GET request. If a stale copy of
+    the page is cached, the request is conditional on the page having changed.
+    Failed requests are retried according to RETRY_POLICY.
     :url: the absolute URL of the desired page.
     :returns: a string of HTML.
     """
-    with THROTTLE_LOCK:
-        # sleep until THROTTLE_DELAY secs have passed since last request
-        wait_left = THROTTLE_DELAY - (time.time() - LAST_REQUEST_TIME.value)
-        if wait_left > 0:
-            time.sleep(wait_left)
+    attempt = 1
+    while True:
+        # wait for a send slot for this host; the limiter is not held during
+        # the request
+        get_limiter().wait(url)
+        try:
+            return request_html(url, allow_redirect, validators)
+        except Exception as err:
+            # backing off penalizes the limiter, so the next wait sleeps
+            if backoff(url, attempt, err) is None:
+                raise
+        attempt += 1
 
-        # make request
-        response = requests.get(url)
 
-        # update last request time for throttling
-        LAST_REQUEST_TIME.value = time.time()
+def get_limiter():
+    """Returns LIMITER, after applying any change made to THROTTLE_DELAY or
+    THROTTLE_BURST since it was last used.
+    """
+    global _THROTTLE_APPLIED
+    if (THROTTLE_DELAY, THROTTLE_BURST) != _THROTTLE_APPLIED:
+        _THROTTLE_APPLIED = (THROTTLE_DELAY, THROTTLE_BURST)
+        LIMITER.set_default(1 / THROTTLE_DELAY, THROTTLE_BURST)
+        for host in HOST_LIMITS:
+            LIMITER.set_limit(host, 1 / THROTTLE_DELAY, THROTTLE_BURST)
+    return LIMITER
+
+
+def backoff(url, attempt, err):
+    """Decides whether to retry a failed request and, if so, holds back all
+    requests to its host (in every process) until the retry is due. A request
+    the server asks to retry later than RETRY_POLICY allows is given up, but
+    its host is still held back for as long as the server asked, up to the
+    policy's `max_delay`.
+    :url: the URL of the failed request.
+    :attempt: the number of attempts made so far.
+    :err: the exception raised by the failed attempt.
+    :returns: the number of seconds until the retry, or None if the request
+        should not be retried.
+    """
+    if isinstance(err, StatusCodeError):
+        delay = RETRY_POLICY.retry_delay(attempt, err.status_code,
+                                         err.retry_after)
+    elif isinstance(err, (requests.ConnectionError, requests.Timeout)):
+        delay = RETRY_POLICY.retry_delay(attempt)
+    else:
+        delay = None
+    if delay is not None:
+        print('{}; retrying in {:.1f}s'.format(err, delay))
+        get_limiter().penalize(url, delay)
+    elif isinstance(err, StatusCodeError):
+        # giving up on a request the server asked to retry much later; the
+        # other requests to the host must still wait, but no longer than a
+        # retry could, so that a bogus header can't stall every worker
+        requested = throttle.parse_retry_after(err.retry_after)
+        if requested:
+            print('{}; not retrying, the server asked to wait {:.0f}s'
+                  .format(err, requested))
+            get_limiter().penalize(url, min(requested,
+                                            RETRY_POLICY.max_delay))
+    return delay
+
+
+def request_html(url, allow_redirect=False, validators=None):
+    """Makes a GET request for the given URL, without throttling or caching.
+    Use `get_html` unless the caller handles both itself.
+    :url: the absolute URL of the desired page.
+    :validators: a dict of validators ('etag', 'last_modified') from a cached
+        copy of the page. If given, the request is conditional.
+    :returns: a tuple of a string of HTML, or None if the page has not changed
+        since the cached copy, and a dict of the response's validators.
+    """
+    headers = {}
+    if validators and validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators and validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+    response = get_session().get(url, headers=headers,
+                                 timeout=REQUEST_TIMEOUT)
+
+    if response.status_code == 304 and headers:
+        return None, validators
 
     # raise ValueError on 4xx status code, get rid of comments, and return
     ret_code_limit = 400 if allow_redirect else 300
     if response.status_code >= ret_code_limit:
-        raise ValueError(
-            'Status Code {} received fetching URL "{}"'
-            .format(response.status_code, url)
-        )
+        raise StatusCodeError(url, response)
     if response.url != url and not allow_redirect:
         raise ValueError(
             'Redirected from {} to {}'.format(url, response.url)
@@ -51,7 +226,45 @@ def get_html(url, allow_redirect=False):
     html = response.text
     html = html.replace('<!--', '').replace('-->', '')
 
-    return html
+    new_validators = {}
+    if response.headers.get('ETag'):
+        new_validators['etag'] = response.headers['ETag']
+    if response.headers.get('Last-Modified'):
+        new_validators['last_modified'] = response.headers['Last-Modified']
+
+    return html, new_validators
+
+
+def get_many(urls, max_workers=None):
+    """Gets the HTML for many URLs. Duplicate URLs are fetched once, cached
+    pages are returned without a request, and the remaining pages are fetched
+    concurrently, subject to the same rate limits as `get_html`.
+    :urls: an iterable of absolute URLs.
+    :max_workers: the number of pages to fetch at once. Defaults to
+        POOL_MAXSIZE.
+    :returns: a dict mapping each URL, in order, to its HTML or to the
+        exception raised while fetching it.
+    """
+    urls = list(dict.fromkeys(urls))
+    results = {}
+    misses = []
+    for url in urls:
+        html = decorators.read_cached_html(url)
+        if html is None:
+            misses.append(url)
+        else:
+            results[url] = html
+
+    if misses:
+        with ThreadPoolExecutor(max_workers=max_workers or POOL_MAXSIZE) as ex:
+            futures = [(url, ex.submit(get_html, url)) for url in misses]
+            for url, future in futures:
+                try:
+                    results[url] = future.result()
+                except Exception as err:
+                    results[url] = err
+
+    return {url: results[url] for url in urls}
 
 
 def parse_table(table, flatten=True, footer=False, partial=False):
@@ -61,7 +274,9 @@ def parse_table(table, flatten=True, footer=False, partial=False):
         all fields as text without cleaning.
     :param footer: If True, returns the summary/footer of the page. Recommended
         to use this with flatten=False. Defaults to False.
-    :returns: pd.DataFrame
+    :returns: pd.DataFrame. When flattening, the columns registered in
+        `schema` have the registered types, and number-y values in the other
+        columns are converted to floats.
     """
     if not len(table):
         return pd.DataFrame()
@@ -70,31 +285,42 @@ def parse_table(table, flatten=True, footer=False, partial=False):
     columns = [c.attrib['data-stat']
                for c in table('thead tr:not([class]) th[data-stat]')]
 
-    # get data
+    # get data, walking the lxml elements of the rows and cells directly;
+    # when flattening, the raw text of some columns is kept in the same pass
     rows = list(table('tbody tr' if not footer else 'tfoot tr')
-                .not_('.thead, .stat_total, .stat_average').items())
-    # and td.attr['data-stat']=='team'
-    data = [
-        [flatten_links(td) if flatten else (td.text() if td.text() else None)
-         for td in row.items('th,td')]
-        for row in rows
-    ]
+                .not_('.thead, .stat_total, .stat_average'))
+    raw_cols = [i for i, col in enumerate(columns)
+                if flatten and col in _RAW_TEXT_COLUMNS]
+    data = []
+    raw_data = []
+    ids = {}
+    for row in rows:
+        cells = list(row.iterdescendants('th', 'td'))
+        if flatten:
+            data.append([_flatten_element(td, ids) for td in cells])
+            raw_data.append([extract_text(cells[i]) or None
+                             if i < len(cells) else None
+                             for i in raw_cols])
+        else:
+            data.append([extract_text(td) or None for td in cells])
 
     # make DataFrame
     df = pd.DataFrame(data, columns=columns, dtype='float')
+    raw = pd.DataFrame(raw_data, columns=[columns[i] for i in raw_cols],
+                       dtype='float')
 
     # add has_class columns
+    row_classes = [row.get('class') for row in rows]
     allClasses = set(
         cls
-        for row in rows
-        if row.attr['class']
-        for cls in row.attr['class'].split()
+        for classes in row_classes
+        if classes
+        for cls in classes.split()
     )
     for cls in allClasses:
         df['has_class_' + cls] = [
-            bool(row.attr['class'] and
-                 cls in row.attr['class'].split())
-            for row in rows
+            bool(classes and cls in classes.split())
+            for classes in row_classes
         ]
 
     # cleaning the DataFrame
@@ -141,19 +367,18 @@ def parse_table(table, flatten=True, footer=False, partial=False):
         if df['gs'].dtype not in [np.float64, np.int64]:
             df['gs'] = (df['gs'].str == '*')
 
-    if 'game_num' in df.columns:
+    if 'game_num' in df.columns and df['game_num'].notnull().all():
         df['game_num'] = df['game_num'].astype(int)
 
     if 'game_result' in df.columns:
         if flatten:
             df.rename(columns={'game_result': 'game_id'}, inplace=True)
-            df[['game_result', 'team_score', 'opp_score']] = parse_table(
-                table, flatten=False)[['game_result', 'team_score', 'opp_score']]
+            (df['game_result'], df['team_score'],
+             df['opp_score']) = _split_game_result(raw.game_result)
+            df['game_result'] = _strip_notes(df.game_result)
         else:
-            df['game_result'], score_col = df.game_result.str.split(' ', 1).str
-            df['team_score'], df['opp_score'] = score_col.str.split('-', 1).str
-            df['team_score'] = df['team_score'].astype(int)
-            df['opp_score'] = df['opp_score'].astype(int)
+            (df['game_result'], df['team_score'],
+             df['opp_score']) = _split_game_result(df.game_result)
 
     if 'score' in df.columns:
         o_score, d_score = zip(*df.score.apply(lambda s: s.split('-')))
@@ -169,8 +394,9 @@ def parse_table(table, flatten=True, footer=False, partial=False):
         if flatten:
             df.rename(columns={'player': 'player_id'}, inplace=True)
             # when flattening, keep a column for names
-            player_names = parse_table(table, flatten=False)['player_name']
-            df['player_name'] = player_names
+            player_names, _, _ = raw.player.str.partition(
+                ' HOF', expand=False).str
+            df['player_name'] = _strip_notes(player_names)
         else:
             df.rename(columns={'player': 'player_name'}, inplace=True)
 
@@ -178,8 +404,7 @@ def parse_table(table, flatten=True, footer=False, partial=False):
     if 'description' in df.columns:
         if flatten:
             # when flattening, keep a column for names
-            raw_descriptions = parse_table(table, flatten=False)['description']
-            df['desc_raw'] = raw_descriptions
+            df['desc_raw'] = _strip_notes(raw.description)
         else:
             df.rename(columns={'description': 'description'}, inplace=True)
 
@@ -190,8 +415,7 @@ def parse_table(table, flatten=True, footer=False, partial=False):
             df = df.loc[~df[team_col].isin(['XXX'])]
             if flatten:
                 df.rename(columns={team_col: 'team_id'}, inplace=True)
-                team_names = parse_table(table, flatten=False)[team_col]
-                df[team_col] = team_names
+                df[team_col] = _strip_notes(raw[team_col])
 
     # season -> int
     if 'season' in df.columns and flatten:
@@ -227,51 +451,14 @@ def parse_table(table, flatten=True, footer=False, partial=False):
          df['draft_pk'], df['draft_yr']) = df.draft_info.str.split(' / ').str
 
     # ignore *, +, and other characters used to note things
-    df.replace(re.compile(r'[\*\+\u2605]', re.U), '', inplace=True)
-    for col in df.columns:
-        if hasattr(df[col], 'str'):
-            df[col] = df[col].str.strip()
-
-    # converts number-y things to floats
-    def convert_to_float(val):
-        # percentages: (number%) -> float(number * 0.01)
-        m = re.search(r'([-\.\d]+)\%',
-                      val if isinstance(val, str) else str(val), re.U)
-        try:
-            if m:
-                return float(m.group(1)) / 100 if m else val
-            if m:
-                return int(m.group(1)) + int(m.group(2)) / 60
-        except ValueError:
-            return val
-        # salaries: $ABC,DEF,GHI -> float(ABCDEFGHI)
-        m = re.search(r'\$[\d,]+',
-                      val if isinstance(val, str) else str(val), re.U)
-        try:
-            if m:
-                return float(re.sub(r'\$|,', '', val))
-        except Exception:
-            return val
-        # generally try to coerce to float, unless it's an int or bool
-        try:
-            if isinstance(val, (int, bool)):
-                return val
-            else:
-                return float(val)
-        except Exception:
-            return val
+    df = df.apply(_strip_notes)
 
+    # builds the registered column types, and converts number-y things in
+    # the other columns to floats
     if flatten:
-        df = df.applymap(convert_to_float)
-        # Convert numeric cols empty vals to NaN
-        for c in ['pass_adj_yds_per_att', 'pass_cmp_perc', 'pass_rating', 'pass_yds_per_att',
-                  'rec_yds_per_rec', 'rec_yds_per_tgt', 'rush_yds_per_att']:
-            try:
-                df[c].replace('', np.nan, inplace=True)
-            except KeyError:
-                pass
+        df = df.apply(_typed_column)
 
-    df = df.loc[df.astype(bool).any(axis=1)]
+    df = df.loc[_any_truthy(df)]
 
     if 'has_class_partial_table' in df and not partial:
         df['has_class_partial_table'] = df['has_class_partial_table']==True
@@ -280,6 +467,128 @@ def parse_table(table, flatten=True, footer=False, partial=False):
     return df
 
 
+def _split_game_result(results):
+    # splits game results like 'W 24-17' into the result and the two scores;
+    # cells that hold no result, such as the record in a footer row, give
+    # missing values
+    is_result = results.map(
+        lambda val: isinstance(val, str) and bool(_GAME_RESULT_RE.match(val)))
+    if len(results) and is_result.all():
+        result_col, score_col = results.str.split(' ', 1).str
+        team_score, opp_score = score_col.str.split('-', 1).str
+        return result_col, team_score.astype(int), opp_score.astype(int)
+    result_col = pd.Series(None, index=results.index, dtype=object)
+    team_score = pd.Series(np.nan, index=results.index)
+    opp_score = pd.Series(np.nan, index=results.index)
+    if is_result.any():
+        (result_col[is_result], team_score[is_result],
+         opp_score[is_result]) = _split_game_result(results[is_result])
+    return result_col, team_score, opp_score
+
+
+def _strip_notes(col):
+    # removes the characters used to note things from a column of strings
+    # and strips the strings; like `.str.strip()`, keeps None and turns other
+    # values that aren't strings to NaN
+    if not hasattr(col, 'str'):
+        return col
+    return pd.Series([_strip_note(val) for val in col.to_numpy()],
+                     index=col.index, name=col.name, dtype=object)
+
+
+def _strip_note(val):
+    if not isinstance(val, str):
+        return None if val is None else np.nan
+    val = val.strip()
+    if '*' in val or '+' in val or '\u2605' in val:
+        val = _NOTES_RE.sub('', val).strip()
+    return val
+
+
+def _to_numbers(col):
+    # converts the percentages, salaries and numbers in a column to floats,
+    # leaving other values as they are
+    if col.dtype != object:
+        return col
+    if hasattr(col, 'str'):
+        # a column of plain numbers (and NaN) is cast in one go
+        try:
+            return pd.Series(col.to_numpy().astype(float), index=col.index,
+                             name=col.name)
+        except ValueError:
+            pass
+    return pd.Series([_convert_to_float(val) for val in col.to_numpy()],
+                     index=col.index, name=col.name,
+                     dtype=object).infer_objects()
+
+
+def _typed_column(col):
+    # builds a column with the type registered for it in `schema`
+    kind = schema.kind_of(col.name)
+    if kind is None:
+        return _to_numbers(col)
+    if kind == schema.ID:
+        return col
+    if kind == schema.CATEGORY:
+        return pd.Series(pd.Categorical(
+            col, categories=schema.categories_of(col.name)),
+            index=col.index, name=col.name)
+
+    # numbers; empty cells are missing
+    if hasattr(col, 'str'):
+        col = col.replace('', np.nan)
+    numbers = _to_numbers(col)
+    if numbers.dtype == object:
+        # some values are not numbers, keep them
+        return numbers
+    if kind == schema.INT:
+        if pd.api.types.is_integer_dtype(numbers.dtype):
+            return numbers
+        values = numbers.to_numpy()
+        if not np.isnan(values).any() and (values == np.round(values)).all():
+            return numbers.astype(np.int64)
+    return numbers.astype(float)
+
+
+def _any_truthy(df):
+    # like `df.astype(bool).any(axis=1)`, where NaN counts as true, for
+    # frames with categorical columns
+    keep = np.zeros(len(df), dtype=bool)
+    for _, col in df.items():
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            col = col.astype(object)
+        keep |= col.astype(bool).to_numpy()
+    return keep
+
+
+def _convert_to_float(val):
+    # converts a number-y value to a float; the substring checks skip the
+    # regexes for most values
+    text = val if isinstance(val, str) else str(val)
+    # percentages: (number%) -> float(number * 0.01)
+    m = '%' in text and _PERCENT_RE.search(text)
+    try:
+        if m:
+            return float(m.group(1)) / 100
+    except ValueError:
+        return val
+    # salaries: $ABC,DEF,GHI -> float(ABCDEFGHI)
+    m = '$' in text and _SALARY_RE.search(text)
+    try:
+        if m:
+            return float(re.sub(r'\$|,', '', val))
+    except Exception:
+        return val
+    # generally try to coerce to float, unless it's an int or bool
+    try:
+        if isinstance(val, (int, bool)):
+            return val
+        else:
+            return float(val)
+    except Exception:
+        return val
+
+
 def parse_info_table(table):
     """Parses an info table, like the "Game Info" table or the "Officials"
     table on the PFR Boxscore page. Keys are lower case and have spaces/special
@@ -352,6 +661,48 @@ def flatten_links(td, _recurse=False):
     return ''.join(_flatten_node(c, strip_s) for c in td.contents())
 
 
+def _flatten_element(el, ids):
+    """`flatten_links` for a single lxml element, without wrapping it and its
+    children in PyQuery objects.
+    :el: the lxml element of the table cell.
+    :ids: a dict caching `rel_url_to_id` for the links of the table.
+    :returns: the string with the links flattened to IDs, or None if the cell
+        has no text.
+    """
+    if not _has_text(el):
+        return None
+
+    # the text nodes and child elements, as PyQuery's contents() returns them
+    contents = [el.text] if el.text else []
+    for child in el:
+        if isinstance(child.tag, str):
+            contents.append(child)
+        if child.tail:
+            contents.append(child.tail)
+
+    # don't strip if the contents are a list - causes problems with regexes
+    strip_s = len(contents) < 2
+    parts = []
+    for c in contents:
+        if isinstance(c, str):
+            parts.append(c.strip() if strip_s else c)
+        elif 'href' in c.attrib:
+            href = c.attrib['href']
+            if href not in ids:
+                ids[href] = rel_url_to_id(href)
+            c_alt = c.text_content().strip() if strip_s else c.text_content()
+            parts.append(ids[href] or c_alt)
+        else:
+            parts.append(_flatten_element(c, ids) or '')
+    return ''.join(parts)
+
+
+def _has_text(el):
+    # whether PyQuery's text() of an element is non-empty: it drops comments,
+    # collapses HTML whitespace (including zero-width spaces) and strips
+    return any(text.replace('\u200b', '').strip() for text in el.itertext())
+
+
 @decorators.memoize
 def rel_url_to_id(url):
     """Converts a relative URL to a unique ID.
@@ -0,0 +1,191 @@
+"""Prefetches the pages for a season or date range into the HTML cache.
+
+Later jobs then read the pages from the cache instead of waiting on PFR.
+
+Usage:
+    python -m nfl_stats.warm --season 2019 [--what boxscores,teams,players]
+    python -m nfl_stats.warm --from 2019-09-05 --to 2019-09-30 --what boxscores
+
+Pages that are already cached and fresh are skipped without a request, so an
+interrupted run resumes where it stopped when it is started again.
+"""
+import argparse
+import datetime
+import sys
+
+from . import boxscores
+from . import cache
+from . import decorators
+from . import players
+from . import teams
+from . import utils
+
+WHAT = ('boxscores', 'teams', 'players')
+
+
+def season_of(date):
+    """Returns the season a game played on `date` belongs to; games in
+    January and February belong to the previous year's season.
+    """
+    return date.year - (date.month <= 2)
+
+
+def boxscore_urls(season, start=None, end=None):
+    """Returns the URLs of the boxscores of a season, optionally only those
+    of games played between the dates `start` and `end` (inclusive).
+    """
+    urls = []
+    for bid in boxscores.get_boxscore_ids(season, season):
+        date = datetime.datetime.strptime(bid[:8], '%Y%m%d').date()
+        if (start is None or start <= date) and (end is None or date <= end):
+            urls.append(boxscores.BoxScore(bid).base_url)
+    return urls
+
+
+def team_urls(season):
+    """Returns the URLs of the season and roster pages of each team that
+    played in a season.
+    """
+    urls = []
+    for team_id in teams.list_teams(season):
+        team = teams.Team(team_id)
+        urls.append(team.team_year_url(season))
+        urls.append(team.team_year_url('{}_roster'.format(season)))
+    return urls
+
+
+def player_urls(season):
+    """Returns the URLs of the main and gamelog pages of every player on a
+    roster in a season. Reads the team roster pages, so these should be
+    warmed first.
+    """
+    player_ids = set()
+    for team_id in teams.list_teams(season):
+        try:
+            roster = teams.Team(team_id).roster(season)
+        except Exception as err:
+            print('Warning: skipping the roster of {} in {}: {}'
+                  .format(team_id, season, err))
+            continue
+        if not roster.empty:
+            player_ids.update(roster.player_id.dropna())
+    urls = []
+    for player_id in sorted(player_ids):
+        player = players.Player(player_id)
+        urls.append(player.base_url)
+        urls.append(player._sub_url('gamelog', season))
+    return urls
+
+
+def is_cached(url):
+    """Returns True if a fresh copy of `url` is in the cache. Only reads the
+    page's metadata, not the page itself.
+    """
+    entry = cache.get_store().info(url)
+    return entry is not None and not decorators.is_stale(entry)
+
+
+def warm(urls, batch_size=100, max_workers=None, verbose=False):
+    """Fetches the pages that are not freshly cached into the cache.
+    :urls: an iterable of absolute URLs.
+    :batch_size: the number of pages fetched between progress reports.
+    :max_workers: the number of pages to fetch at once, see
+        `utils.get_many`.
+    :verbose: if True, prints each URL fetched.
+    :returns: a tuple of the number of pages already cached, the number
+        fetched, and a dict mapping each URL that failed to its exception.
+    """
+    urls = list(dict.fromkeys(urls))
+    missing = [url for url in urls if not is_cached(url)]
+    cached = len(urls) - len(missing)
+    fetched = 0
+    failed = {}
+    for i in range(0, len(missing), batch_size):
+        batch = missing[i:i + batch_size]
+        for url, result in utils.get_many(batch, max_workers).items():
+            if isinstance(result, Exception):
+                failed[url] = result
+            else:
+                fetched += 1
+                if verbose:
+                    print('  {}'.format(url))
+        print('  {}/{} pages fetched, {} failed'.format(
+            fetched, len(missing), len(failed)))
+    return cached, fetched, failed
+
+
+def _parse_seasons(text):
+    first, _, last = text.partition('-')
+    return list(range(int(first), int(last or first) + 1))
+
+
+def _parse_date(text):
+    return datetime.datetime.strptime(text, '%Y-%m-%d').date()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m nfl_stats.warm',
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument('--season', action='append', type=_parse_seasons,
+                        default=[], metavar='YEAR',
+                        help='a season or range of seasons, e.g. 2019 or '
+                             '2015-2019; repeatable')
+    parser.add_argument('--from', dest='start', type=_parse_date,
+                        metavar='DATE',
+                        help='only boxscores of games on or after this date '
+                             '(YYYY-MM-DD)')
+    parser.add_argument('--to', dest='end', type=_parse_date,
+                        metavar='DATE',
+                        help='only boxscores of games on or before this date '
+                             '(YYYY-MM-DD)')
+    parser.add_argument('--what', default=','.join(WHAT),
+                        help='comma-separated kinds of pages to fetch, '
+                             'from: {}'.format(', '.join(WHAT)))
+    parser.add_argument('--workers', type=int,
+                        help='the number of pages to fetch at once')
+    parser.add_argument('--batch-size', type=int, default=100,
+                        help='pages fetched between progress reports')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='list the URLs fetched')
+    args = parser.parse_args(argv)
+
+    what = [w.strip() for w in args.what.split(',') if w.strip()]
+    unknown = set(what) - set(WHAT)
+    if unknown:
+        parser.error('unknown kinds of pages: {}'.format(', '.join(unknown)))
+    seasons = sorted({s for group in args.season for s in group})
+    if not seasons and args.start:
+        seasons = list(range(season_of(args.start),
+                             season_of(args.end or datetime.date.today()) + 1))
+    if not seasons:
+        parser.error('give a --season or a --from date')
+
+    enumerate_urls = {
+        'boxscores': lambda s: boxscore_urls(s, args.start, args.end),
+        'teams': team_urls,
+        'players': player_urls,
+    }
+    failed = {}
+    try:
+        for season in seasons:
+            # in WHAT order, as player pages are found from the team rosters
+            for kind in [w for w in WHAT if w in what]:
+                print('{} {}:'.format(season, kind))
+                if kind == 'players' and 'teams' not in what:
+                    warm(team_urls(season), args.batch_size, args.workers)
+                urls = enumerate_urls[kind](season)
+                cached, fetched, kind_failed = warm(
+                    urls, args.batch_size, args.workers, args.verbose)
+                print('  {} pages: {} already cached, {} fetched, {} failed'
+                      .format(len(urls), cached, fetched, len(kind_failed)))
+                failed.update(kind_failed)
+    except KeyboardInterrupt:
+        print('Interrupted; run the same command again to resume')
+        return 130
+    for url, err in failed.items():
+        print('Failed: {}: {}'.format(url, err))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
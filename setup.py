@@ -10,10 +10,18 @@ setup(
     install_requires=[
         'appdirs',
         'boltons',
-        'mementos',
         'numpy',
         'pandas',
-        'pyquery',
+        # pyquery.text.extract_text, used by parse_table, is new in 1.4
+        'pyquery>=1.4',
         'requests',
-    ]
+    ],
+    extras_require={
+        # lets the HTTP session negotiate brotli-compressed responses
+        'brotli': ['brotli'],
+        # compresses cached pages with zstd instead of gzip
+        'zstd': ['zstandard'],
+        # stores parsed tables as Parquet instead of pickles
+        'parquet': ['pyarrow'],
+    },
 )
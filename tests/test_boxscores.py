@@ -0,0 +1,30 @@
+from nfl_stats import boxscores, utils
+
+
+def _games_page(boxscore_cells):
+    rows = ''.join(
+        '<tr><th data-stat="week_num">{}</th>'
+        '<td data-stat="boxscore_word">{}</td>'
+        '<td data-stat="winner"><a href="/teams/nwe/2019.htm">New England'
+        ' Patriots</a></td></tr>'.format(week, cell)
+        for week, cell in enumerate(boxscore_cells, 1))
+    # like PFR's pages, not well-formed XML, so that PyQuery parses it as HTML
+    return ('<html><head><meta charset="utf-8"></head><body>'
+            '<table id="games"><thead><tr>'
+            '<th data-stat="week_num">Week</th>'
+            '<th data-stat="boxscore_word"></th>'
+            '<th data-stat="winner">Winner/tie</th>'
+            '</tr></thead><tbody>{}</tbody></table></body></html>'.format(rows))
+
+
+def test_get_boxscore_ids_skips_games_without_a_boxscore(monkeypatch):
+    page = _games_page([
+        '<a href="/boxscores/201909080nwe.htm">boxscore</a>',
+        '<a href="/boxscores/201909150mia.htm">boxscore</a>',
+        '',
+        '<a href="/boxscores/201909290buf.htm">boxscore</a>',
+    ])
+    monkeypatch.setattr(utils, 'get_many',
+                        lambda urls: {url: page for url in urls})
+    assert boxscores.get_boxscore_ids(2019, 2019) == [
+        '201909080nwe', '201909150mia', '201909290buf']
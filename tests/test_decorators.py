@@ -0,0 +1,16 @@
+from pyquery import PyQuery as pq
+
+from nfl_stats import decorators
+
+
+def test_copy_free_memoize_protects_documents():
+    @decorators.memoize(copy_free=True)
+    def get_doc(name):
+        return pq('<html><body><div id="name">{}</div><p>note</p>'
+                  '</body></html>'.format(name))
+
+    doc = get_doc('Tom Brady')
+    doc('p').remove()
+    doc('#name').text('changed')
+    assert get_doc('Tom Brady')('#name').text() == 'Tom Brady'
+    assert len(get_doc('Tom Brady')('p')) == 1
@@ -0,0 +1,13 @@
+from nfl_stats import throttle
+
+
+def test_parse_retry_after():
+    assert throttle.parse_retry_after('5') == 5.
+    assert throttle.parse_retry_after('-3') == 0.
+    assert throttle.parse_retry_after('soon') is None
+    assert throttle.parse_retry_after(None) is None
+
+
+def test_parse_retry_after_rejects_non_finite_values():
+    for value in ('inf', '-inf', 'nan', 'Infinity'):
+        assert throttle.parse_retry_after(value) is None
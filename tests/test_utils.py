@@ -0,0 +1,46 @@
+import numpy as np
+from pyquery import PyQuery as pq
+
+from nfl_stats import utils
+
+
+def _cell(tag, stat, content):
+    return '<{0} data-stat="{1}">{2}</{0}>'.format(tag, stat, content)
+
+
+def _game_log():
+    stats = ['game_date', 'game_num', 'team', 'opp', 'game_result',
+             'pass_yds']
+    head = ''.join(_cell('th', stat, stat) for stat in stats)
+    games = [('2019-09-08', '1', 'NWE', 'PIT', 'W 33-3', '341'),
+             ('2019-09-15', '2', 'NWE', 'MIA', 'W 43-0', '264')]
+    body = ''.join(
+        '<tr>{}</tr>'.format(''.join(
+            _cell('td', stat, '<a href="/teams/{}/2019.htm">{}</a>'.format(
+                value.lower(), value) if stat in ('team', 'opp') else value)
+            for stat, value in zip(stats, game)))
+        for game in games)
+    foot = ''.join(_cell('td', stat, value) for stat, value in zip(
+        stats, ['2 Games', '', '', '', '2-0', '605']))
+    # like PFR's pages, not well-formed XML, so that PyQuery parses it as HTML
+    html = ('<html><head><meta charset="utf-8"></head><body>'
+            '<table id="stats"><thead><tr>{}</tr></thead><tbody>{}</tbody>'
+            '<tfoot><tr>{}</tr></tfoot></table></body></html>'
+            .format(head, body, foot))
+    return pq(html)('table#stats')
+
+
+def test_parse_table_game_log():
+    df = utils.parse_table(_game_log())
+    assert list(df['game_result']) == ['W', 'W']
+    assert list(df['team_score']) == [33, 43]
+    assert list(df['opp_score']) == [3, 0]
+
+
+def test_parse_table_game_log_footer():
+    for flatten in (True, False):
+        df = utils.parse_table(_game_log(), flatten=flatten, footer=True)
+        assert len(df) == 1
+        assert df['pass_yds'].iloc[0] in (605, '605')
+        assert np.isnan(df['team_score'].iloc[0])
+        assert np.isnan(df['opp_score'].iloc[0])